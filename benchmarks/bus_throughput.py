@@ -0,0 +1,115 @@
+"""Broadcast throughput of ``UnixSocketBus`` between worker processes.
+
+Run::
+
+    python benchmarks/bus_throughput.py [WORKERS [SESSIONS [MESSAGES]]]
+
+A ``UnixSocketBroker`` is started in the main process and ``WORKERS``
+processes connect to it, each with a ``SessionManager`` of ``SESSIONS``
+open sessions. Worker 0 broadcasts ``MESSAGES`` messages, the time is
+measured until every other worker has queued all of them into its
+sessions. Outgoing queues keep the last 100 messages, so the benchmark
+measures the bus and the local fan-out instead of memory growth.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+from sockjs import QueueLimits, SessionManager, SessionState, UnixSocketBroker
+from sockjs import UnixSocketBus
+
+
+async def handler(manager, session, msg):
+    pass
+
+
+async def worker_main(idx, path, sessions, messages, ready, go, done):
+    bus = UnixSocketBus(path)
+    manager = SessionManager(
+        "bench",
+        web.Application(),
+        handler,
+        disconnect_delay=3600,
+        queue_limits=QueueLimits(max_messages=100),
+        bus=bus,
+    )
+    for sid in range(sessions):
+        manager.get("s%d" % sid, True).state = SessionState.OPEN
+    await bus.start()
+    ready.put(idx)
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, go.wait)
+    if idx == 0:
+        for num in range(messages):
+            manager.broadcast("message %d" % num)
+            if num % 100 == 99:
+                await asyncio.sleep(0)
+    else:
+        while bus.received < messages:
+            await asyncio.sleep(0.001)
+        done.put((idx, time.perf_counter()))
+
+    await asyncio.sleep(0.1)
+    await bus.close()
+    await manager.stop()
+
+
+def worker(*args):
+    asyncio.run(worker_main(*args))
+
+
+async def run(workers: int, sessions: int, messages: int):
+    path = os.path.join(tempfile.mkdtemp(), "bus.sock")
+    broker = UnixSocketBroker(path)
+    await broker.start()
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, done, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [
+        ctx.Process(
+            target=worker, args=(idx, path, sessions, messages, ready, go, done)
+        )
+        for idx in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    loop = asyncio.get_running_loop()
+    for _ in procs:
+        await loop.run_in_executor(None, ready.get)
+    started = time.perf_counter()
+    go.set()
+    finished = [await loop.run_in_executor(None, done.get) for _ in procs[1:]]
+    elapsed = max(stamp for _, stamp in finished) - started
+
+    for proc in procs:
+        await loop.run_in_executor(None, proc.join)
+    await broker.close()
+    return elapsed
+
+
+def main(workers: int, sessions: int, messages: int):
+    elapsed = asyncio.run(run(workers, sessions, messages))
+    delivered = messages * sessions * (workers - 1)
+    print(
+        "%d workers, %d sessions per worker, %d messages"
+        % (workers, sessions, messages)
+    )
+    print("%12s %16s %20s" % ("seconds", "bus messages/s", "session messages/s"))
+    print(
+        "%12.3f %16.0f %20.0f"
+        % (elapsed, messages * (workers - 1) / elapsed, delivered / elapsed)
+    )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    defaults = [4, 100, 20000]
+    main(*args, *defaults[len(args):])
@@ -0,0 +1,90 @@
+"""Cost of turning a message into the bytes written to a response.
+
+Run::
+
+    python benchmarks/frame_pipeline.py [MESSAGE_SIZE ...]
+
+For every transport the ``str`` path of 0.13 (``dumps`` into ``str``,
+wrapping with ``str`` operations and a final ``.encode()``) is compared with
+the bytes path: ``message_frame()`` and the transport's ``_encode()``.
+The ``broadcast`` column wraps one ``FrameBlob`` for 1000 sessions, so it
+includes the wire form cache.
+"""
+
+import sys
+import timeit
+
+from sockjs.protocol import FrameBlob, dumps, message_frame
+from sockjs.transports import (
+    EventsourceTransport,
+    HTMLFileTransport,
+    JSONPolling,
+    XHRStreamingTransport,
+    XHRTransport,
+)
+
+SESSIONS = 1000
+
+
+def str_encoders():
+    return {
+        "xhr": lambda frame: (frame + "\n").encode(),
+        "xhr_streaming": lambda frame: (frame + "\n").encode(),
+        "eventsource": lambda frame: ("data: %s\r\n\r\n" % frame).encode(),
+        "htmlfile": lambda frame: (
+            "<script>\np(%s);\n</script>\r\n" % dumps(frame)
+        ).encode(),
+        "jsonp": lambda frame: ("/**/%s(%s);\r\n" % ("cb", dumps(frame))).encode(),
+    }
+
+
+def bytes_transports():
+    transports = {}
+    for name, cls in (
+        ("xhr", XHRTransport),
+        ("xhr_streaming", XHRStreamingTransport),
+        ("eventsource", EventsourceTransport),
+        ("htmlfile", HTMLFileTransport),
+        ("jsonp", JSONPolling),
+    ):
+        transport = cls.__new__(cls)
+        transport.callback = "cb"
+        transports[name] = transport
+    return transports
+
+
+def run(size: int, number: int):
+    message = "x" * size
+    str_paths = str_encoders()
+    transports = bytes_transports()
+
+    print("message size %d bytes, usec per frame" % size)
+    print("%14s %10s %10s %10s" % ("transport", "str", "bytes", "broadcast"))
+    for name, transport in transports.items():
+        str_encode = str_paths[name]
+
+        def old():
+            str_encode("a" + dumps([message]))
+
+        def new():
+            transport._encode(message_frame(message))
+
+        def broadcast():
+            blob = FrameBlob(message_frame(message))
+            for _ in range(SESSIONS):
+                transport._wire(blob)
+
+        rounds = max(number // SESSIONS, 1)
+        results = (
+            timeit.timeit(old, number=number) / number,
+            timeit.timeit(new, number=number) / number,
+            timeit.timeit(broadcast, number=rounds) / (rounds * SESSIONS),
+        )
+        print("%14s %10.3f %10.3f %10.3f" % (name, *(t * 1e6 for t in results)))
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [16, 1024, 65536]
+    for size in sizes:
+        run(size, 100000 if size < 4096 else 5000)
+        print()
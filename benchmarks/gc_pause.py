@@ -0,0 +1,51 @@
+"""GC pause time of ``SessionManager`` versus the number of sessions.
+
+Run::
+
+    python benchmarks/gc_pause.py [SESSIONS ...]
+
+For every session count the pass is measured twice: when nothing has
+expired and when 1% of the sessions have passed their deadline.
+"""
+
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from sockjs import SessionManager
+
+
+async def handler(manager, session, msg):
+    pass
+
+
+async def gc_pause(count: int, expired_ratio: float) -> float:
+    manager = SessionManager("bench", web.Application(), handler)
+    for idx in range(count):
+        manager.get("s%d" % idx, create=True)
+
+    past = time.monotonic() - 1
+    for idx in range(int(count * expired_ratio)):
+        manager.sessions["s%d" % idx].expires = past
+
+    started = time.perf_counter()
+    await manager._gc_expired_sessions()
+    elapsed = time.perf_counter() - started
+
+    await manager.stop()
+    return elapsed
+
+
+async def main(counts):
+    print("%10s %14s %14s" % ("sessions", "idle gc, ms", "1% expired, ms"))
+    for count in counts:
+        idle = await gc_pause(count, 0)
+        expired = await gc_pause(count, 0.01)
+        print("%10d %14.3f %14.3f" % (count, idle * 1000, expired * 1000))
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000, 300000]
+    asyncio.run(main(counts))
@@ -0,0 +1,62 @@
+"""Inbound throughput of per-message and batched handler dispatch.
+
+Run::
+
+    python benchmarks/inbound_batch.py [BATCH_SIZE ...]
+
+Payloads of ``BATCH_SIZE`` messages, as sent by ``xhr_send`` or a websocket
+array frame, are passed to ``SessionManager.remote_messages()``. The
+``single`` mode calls the handler once per message, the ``batched`` mode
+(``batch_messages=True``) once per payload with ``MsgType.MESSAGES``.
+Handlers store messages like a bulk insert into a database would.
+"""
+
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from sockjs import MsgType, SessionManager
+
+MESSAGES = 200000
+
+
+async def run(batch_size: int, batched: bool):
+    stored = []
+
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            stored.append(msg.data)
+        elif msg.type == MsgType.MESSAGES:
+            stored.extend(msg.data)
+
+    manager = SessionManager(
+        "bench", web.Application(), handler, batch_messages=batched
+    )
+    session = manager.get("s1", True)
+    payload = ["message %d" % idx for idx in range(batch_size)]
+
+    started = time.perf_counter()
+    for _ in range(MESSAGES // batch_size):
+        await manager.remote_messages(session, payload)
+    elapsed = time.perf_counter() - started
+
+    assert len(stored) == MESSAGES // batch_size * batch_size
+    await manager.clear()
+    return len(stored) / elapsed
+
+
+def main(sizes):
+    print(
+        "%10s %14s %14s %8s"
+        % ("batch size", "single msg/s", "batched msg/s", "ratio")
+    )
+    for size in sizes:
+        single = asyncio.run(run(size, False))
+        batched = asyncio.run(run(size, True))
+        print("%10d %14.0f %14.0f %8.1f" % (size, single, batched, batched / single))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 10, 200])
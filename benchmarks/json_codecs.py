@@ -0,0 +1,54 @@
+"""Codecs of ``sockjs.codec`` on outgoing frames and inbound payloads.
+
+Run::
+
+    python benchmarks/json_codecs.py [MESSAGE_SIZE ...]
+
+``message_frame`` and ``messages_frame`` build frames of one and of 16
+messages, ``loads`` decodes a payload of 16 messages as it is read from
+a request body. Codecs whose library is not installed are skipped.
+"""
+
+import sys
+import timeit
+
+from sockjs.codec import JSONCodec, MsgspecCodec, OrjsonCodec
+
+BATCH = 16
+
+
+def make_codecs():
+    codecs = []
+    for cls in (JSONCodec, OrjsonCodec, MsgspecCodec):
+        try:
+            codecs.append(cls())
+        except RuntimeError:
+            print("%s is skipped, its library is not installed" % cls.__name__)
+    return codecs
+
+
+def run(codecs, size: int, number: int):
+    message = ("юникод " * size)[:size]
+    messages = [message] * BATCH
+    payload = JSONCodec().dumps(messages)
+
+    print("message size %d chars, usec per call" % size)
+    print("%10s %15s %15s %10s" % ("codec", "message_frame", "messages_frame", "loads"))
+    for codec in codecs:
+        results = (
+            timeit.timeit(lambda: codec.message_frame(message), number=number),
+            timeit.timeit(lambda: codec.messages_frame(messages), number=number),
+            timeit.timeit(lambda: codec.loads(payload), number=number),
+        )
+        print(
+            "%10s %15.3f %15.3f %10.3f"
+            % (codec.name, *(t * 1e6 / number for t in results))
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [16, 1024, 65536]
+    codecs = make_codecs()
+    for size in sizes:
+        run(codecs, size, 50000 if size < 4096 else 1000)
+        print()
@@ -0,0 +1,200 @@
+"""Microbenchmarks of protocol framing and session queue primitives.
+
+Run::
+
+    python benchmarks/micro.py [--group framing|session|broadcast ...]
+        [--sessions N ...] [--payload NAME ...] [--save PATH]
+
+Payloads are ASCII and Unicode messages of 16 and 65536 characters, the
+Unicode ones mix Cyrillic, CJK and emoji, which ``json`` escapes.
+
+``framing`` times ``message_frame()``, ``messages_frame()`` and
+``close_frame()`` of ``sockjs.protocol`` and of every installed codec,
+``dumps()`` of a list of 16 messages and ``loads()`` of that payload.
+
+``session`` times ``Session.feed()`` of messages packed into one frame,
+and ``Session.get_frame()`` of a frame of 16 messages with ``pack=True``,
+which encodes the frame, and with ``pack=False``.
+
+``broadcast`` times ``SessionManager.broadcast()`` to ``N`` open sessions,
+1000, 10000 and 100000 by default.
+
+Times are usec per call, broadcast times are msec per call. With
+``--save`` results are written as JSON, like ``benchmarks/suite.py``.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import timeit
+
+from aiohttp import web
+
+from sockjs import Frame, Session, SessionManager, SessionState, protocol
+from sockjs.codec import JSONCodec, MsgspecCodec, OrjsonCodec
+
+BATCH = 16
+UNICODE = "юникод 漢字テキスト 😀🎉 "
+PAYLOADS = {
+    "ascii-16": ("sockjs message " * 2)[:16],
+    "unicode-16": (UNICODE * 2)[:16],
+    "ascii-64k": ("sockjs message " * 4370)[:65536],
+    "unicode-64k": (UNICODE * 3000)[:65536],
+}
+GROUPS = ("framing", "session", "broadcast")
+
+
+async def handler(manager, session, msg):
+    pass
+
+
+def number_for(message: str, small: int, large: int) -> int:
+    return small if len(message) < 4096 else large
+
+
+def framing(payloads):
+    """usec per call of framing functions of every codec."""
+    backends = {"protocol": protocol}
+    for cls in (JSONCodec, OrjsonCodec, MsgspecCodec):
+        try:
+            backends[cls.name] = cls()
+        except RuntimeError:
+            print("%s is skipped, its library is not installed" % cls.__name__)
+
+    results = {}
+    for payload_name, message in payloads.items():
+        number = number_for(message, 20000, 200)
+        messages = [message] * BATCH
+        encoded = JSONCodec().dumps(messages)
+        for name, backend in backends.items():
+            calls = {
+                "message_frame": lambda: backend.message_frame(message),
+                "messages_frame": lambda: backend.messages_frame(messages),
+                "close_frame": lambda: backend.close_frame(3000, message),
+                "dumps": lambda: backend.dumps(messages),
+                "loads": lambda: backend.loads(encoded),
+            }
+            results[payload_name, name] = {
+                call: timeit.timeit(func, number=number) * 1e6 / number
+                for call, func in calls.items()
+            }
+    return results
+
+
+async def session_queue(payloads):
+    """usec per call of feeding and taking frames of a session queue."""
+    results = {}
+    for payload_name, message in payloads.items():
+        rounds = number_for(message, 5000, 100)
+        session = Session("bench", disconnect_delay=3600)
+        session.state = SessionState.OPEN
+
+        feed = pack = raw = 0.0
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(BATCH):
+                session.feed(Frame.MESSAGE, message)
+            feed += time.perf_counter() - started
+
+            started = time.perf_counter()
+            await session.get_frame(pack=True)
+            pack += time.perf_counter() - started
+
+            for _ in range(BATCH):
+                session.feed(Frame.MESSAGE, message)
+            started = time.perf_counter()
+            await session.get_frame(pack=False)
+            raw += time.perf_counter() - started
+
+        results[payload_name] = {
+            "feed": feed * 1e6 / (rounds * BATCH),
+            "get_frame_packed": pack * 1e6 / rounds,
+            "get_frame_unpacked": raw * 1e6 / rounds,
+        }
+    return results
+
+
+async def broadcast(payloads, counts, rounds=5):
+    """msec per broadcast to every count of open sessions."""
+    results = {}
+    for count in counts:
+        manager = SessionManager(
+            "bench", web.Application(), handler, disconnect_delay=3600
+        )
+        sessions = [manager.get("s%d" % idx, True) for idx in range(count)]
+        for session in sessions:
+            session.state = SessionState.OPEN
+
+        for payload_name, message in payloads.items():
+            elapsed = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                manager.broadcast(message)
+                elapsed.append(time.perf_counter() - started)
+                # drain queues outside of the measured time
+                for session in sessions:
+                    await session.get_frame()
+            results[count, payload_name] = {"broadcast": min(elapsed) * 1e3}
+
+        await manager.clear()
+    return results
+
+
+def print_table(title: str, rows: dict, key_names):
+    columns = list(next(iter(rows.values())))
+    print(title)
+    print("".join("%14s" % name for name in key_names), end="")
+    print("".join("%20s" % column for column in columns))
+    for key, values in rows.items():
+        key = key if isinstance(key, tuple) else (key,)
+        print("".join("%14s" % part for part in key), end="")
+        print("".join("%20.3f" % values[column] for column in columns))
+    print()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--group", action="append", choices=GROUPS, dest="groups")
+    parser.add_argument("--sessions", type=int, nargs="+")
+    parser.add_argument("--payload", action="append", choices=list(PAYLOADS))
+    parser.add_argument("--save", metavar="PATH")
+    args = parser.parse_args(argv)
+    groups = args.groups or GROUPS
+    counts = args.sessions or [1000, 10000, 100000]
+    payloads = {name: PAYLOADS[name] for name in (args.payload or PAYLOADS)}
+
+    results = {}
+    if "framing" in groups:
+        rows = framing(payloads)
+        print_table("framing, usec per call", rows, ("payload", "backend"))
+        results["framing"] = rows
+    if "session" in groups:
+        rows = asyncio.run(session_queue(payloads))
+        print_table("session queue, usec per call", rows, ("payload",))
+        results["session"] = rows
+    if "broadcast" in groups:
+        rows = asyncio.run(broadcast(payloads, counts))
+        print_table("broadcast, msec per call", rows, ("sessions", "payload"))
+        results["broadcast"] = rows
+
+    if args.save:
+        saved = {
+            "meta": {"python": platform.python_version()},
+            "results": {
+                group: {
+                    "/".join(map(str, key if isinstance(key, tuple) else (key,))): row
+                    for key, row in rows.items()
+                }
+                for group, rows in results.items()
+            },
+        }
+        with open(args.save, "w") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
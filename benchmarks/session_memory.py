@@ -0,0 +1,63 @@
+"""Memory used by idle sessions.
+
+Run::
+
+    python benchmarks/session_memory.py [SESSIONS ...]
+
+``new`` sessions are created with ``SessionManager.get(create=True)`` and
+never acquired. ``drained`` sessions are acquired like by a polling
+request, which opens them, their open frame is taken and they are
+released, like sessions between two polls. The reported size includes the
+session object, its entry in ``SessionManager.sessions`` and in the expiry
+index, but not the session id.
+"""
+
+import asyncio
+import gc
+import sys
+import tracemalloc
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from sockjs import SessionManager
+
+
+async def handler(manager, session, msg):
+    pass
+
+
+async def bytes_per_session(count: int, drained: bool) -> float:
+    manager = SessionManager("bench", web.Application(), handler)
+    session_ids = ["%0.9d" % idx for idx in range(count)]
+    request = make_mocked_request("POST", "/sockjs/000/0/xhr")
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for session_id in session_ids:
+            session = manager.get(session_id, create=True)
+            if drained:
+                await manager.acquire(session, request)
+                await session.get_frame()
+                await manager.release(session)
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    await manager.stop()
+    return size / count
+
+
+async def main(counts):
+    print("%10s %18s %18s" % ("sessions", "new, bytes", "drained, bytes"))
+    for count in counts:
+        new = await bytes_per_session(count, False)
+        drained = await bytes_per_session(count, True)
+        print("%10d %18.1f %18.1f" % (count, new, drained))
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    asyncio.run(main(counts))
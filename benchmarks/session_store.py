@@ -0,0 +1,131 @@
+"""Cost of a session store per request.
+
+Run::
+
+    python benchmarks/session_store.py [ROUNDS]
+
+The first table times the store operations behind one polling request:
+the owner lookup of an unknown session, acquire and release, passing an
+inbound message to the owner and a frame back. Requests served through the
+store wait for the next exchange of the owner, every ``store_interval``
+seconds of ``add_endpoint()``. The second table measures
+``xhr_send`` and ``xhr`` round trips of an echo handler served by the
+worker owning the session (no store, memory store) and by another worker
+through the store. Both workers run in this process, the SQLite database
+is created in a temporary directory.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import sockjs
+from sockjs import MemoryStore, MsgType, SQLiteStore
+from sockjs.protocol import Frame
+
+
+def make_stores(kind, path):
+    if kind == "memory":
+        store = MemoryStore(0)
+        return store, store.for_worker(1)
+    if os.path.exists(path):
+        os.unlink(path)
+    return SQLiteStore(path, worker=0), SQLiteStore(path, worker=1)
+
+
+def operations(kind, path, number):
+    owner, remote = make_stores(kind, path)
+    for idx in range(1000):
+        owner.add("bench", "s%d" % idx)
+
+    def lookup():
+        remote.owner("bench", "unknown")
+
+    def acquire_release():
+        remote.acquire("bench", "s1")
+        remote.release("bench", "s1")
+
+    def inbound():
+        remote.put_inbound("bench", "s1", 0, MsgType.MESSAGE, b'["ping"]')
+        owner.take_inbound("bench")
+
+    def frames():
+        owner.put_frame("bench", "s1", Frame.MESSAGE, b'a["ping"]')
+        remote.take_frames("bench", "s1")
+
+    results = [
+        timeit.timeit(func, number=number) / number * 1e6
+        for func in (lookup, acquire_release, inbound, frames)
+    ]
+    asyncio.run(owner.close())
+    asyncio.run(remote.close())
+    return results
+
+
+async def echo(manager, session, msg):
+    if msg.type == MsgType.MESSAGE:
+        session.send(msg.data)
+
+
+async def round_trips(kind, path, rounds):
+    if kind == "none":
+        stores = (None, None)
+    else:
+        stores = make_stores(kind, path[:-3] + "-rt.db")
+    servers = []
+    for store in stores:
+        app = web.Application()
+        sockjs.add_endpoint(app, echo, name="bench", store=store)
+        servers.append(TestServer(app))
+
+    results = []
+    async with servers[0], servers[1], aiohttp.ClientSession() as client:
+        owner, other = (server.make_url("/sockjs/000/s1") for server in servers)
+        async with client.post("%s/xhr" % owner) as resp:
+            assert await resp.read() == b"o\n"
+
+        targets = [owner] if kind == "none" else [owner, other]
+        for url in targets:
+            started = time.perf_counter()
+            for _ in range(rounds):
+                async with client.post("%s/xhr_send" % url, data=b'["ping"]') as resp:
+                    assert resp.status == 204
+                async with client.post("%s/xhr" % url) as resp:
+                    assert await resp.read() == b'a["ping"]\n'
+            results.append((time.perf_counter() - started) / rounds * 1e3)
+    # stores are closed on cleanup of the applications
+    return results
+
+
+def main(rounds: int):
+    path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+
+    print("store operations, usec")
+    print(
+        "%8s %10s %16s %10s %10s"
+        % ("store", "lookup", "acquire+release", "inbound", "frame")
+    )
+    for kind in ("memory", "sqlite"):
+        results = operations(kind, path, 20000)
+        print("%8s %10.2f %16.2f %10.2f %10.2f" % (kind, *results))
+
+    print()
+    print("xhr_send + xhr round trip, msec, %d rounds" % rounds)
+    print("%8s %10s %10s" % ("store", "owner", "remote"))
+    for kind in ("none", "memory", "sqlite"):
+        results = asyncio.run(round_trips(kind, path, rounds))
+        print(
+            "%8s %10.3f %10s"
+            % (kind, results[0], "%.3f" % results[1] if len(results) > 1 else "-")
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,112 @@
+"""Writes and throughput of streaming transports under bursty broadcast.
+
+Run::
+
+    python benchmarks/streaming_burst.py [SESSIONS [BURST [BURSTS]]]
+
+``SESSIONS`` xhr-streaming clients are connected to a local server and
+``BURSTS`` times ``BURST`` messages are broadcast within one event loop
+iteration. Every response write is a ``send()`` system call at least.
+The ``per-frame`` mode writes every frame separately, like 0.13 did,
+the ``coalesced`` mode writes all frames ready in the session queue at once.
+"""
+
+import asyncio
+import sys
+import time
+from unittest import mock
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import sockjs
+from sockjs import Session
+
+
+async def handler(manager, session, msg):
+    pass
+
+
+async def get_one_frame(self, pack=True, max_bytes=None):
+    return [await self.get_frame(pack)]
+
+
+async def read_messages(client, url, expected, connected):
+    async with client.post(url) as resp:
+        count = 0
+        async for line in resp.content:
+            if line == b"o\n":
+                connected.set_result(None)
+            elif line.startswith(b"a["):
+                count += 1
+                if count == expected:
+                    return
+
+
+async def run(sessions: int, burst: int, bursts: int):
+    app = web.Application()
+    sockjs.add_endpoint(app, handler, name="bench")
+    manager = sockjs.get_manager("bench", app)
+
+    writes = 0
+    write = web.StreamResponse.write
+
+    async def counted_write(self, data):
+        nonlocal writes
+        writes += 1
+        await write(self, data)
+
+    async with TestServer(app) as server, aiohttp.ClientSession() as client:
+        loop = asyncio.get_running_loop()
+        connected = [loop.create_future() for _ in range(sessions)]
+        readers = [
+            asyncio.ensure_future(
+                read_messages(
+                    client,
+                    server.make_url("/sockjs/000/s%d/xhr_streaming" % idx),
+                    burst * bursts,
+                    connected[idx],
+                )
+            )
+            for idx in range(sessions)
+        ]
+        await asyncio.gather(*connected)
+
+        with mock.patch.object(web.StreamResponse, "write", counted_write):
+            started = time.perf_counter()
+            for _ in range(bursts):
+                for idx in range(burst):
+                    manager.broadcast("message %d" % idx)
+                await asyncio.sleep(0.001)
+            await asyncio.gather(*readers)
+            elapsed = time.perf_counter() - started
+
+        await manager.clear()
+
+    return writes, elapsed
+
+
+async def main(sessions: int, burst: int, bursts: int):
+    messages = sessions * burst * bursts
+    print(
+        "%d sessions, %d bursts of %d messages, %d messages delivered"
+        % (sessions, bursts, burst, messages)
+    )
+    print("%10s %10s %16s %14s" % ("mode", "writes", "writes/message", "messages/s"))
+    for mode in ("per-frame", "coalesced"):
+        if mode == "per-frame":
+            with mock.patch.object(Session, "get_frames", get_one_frame):
+                writes, elapsed = await run(sessions, burst, bursts)
+        else:
+            writes, elapsed = await run(sessions, burst, bursts)
+        print(
+            "%10s %10d %16.3f %14.0f"
+            % (mode, writes, writes / messages, messages / elapsed)
+        )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    defaults = [100, 50, 20]
+    asyncio.run(main(*args, *defaults[len(args):]))
@@ -0,0 +1,377 @@
+"""Echo and broadcast performance of every transport with concurrent clients.
+
+Run::
+
+    python benchmarks/suite.py [--clients N] [--messages M] [--broadcasts B]
+        [--repeat R] [--transport NAME ...] [--save PATH] [--baseline PATH]
+        [--threshold [METRIC=]RATIO ...]
+
+For every transport of ``transport_handlers`` and ``websocket-raw`` an
+application with an echo endpoint is served by a local ``TestServer`` and
+``N`` clients connect to it. Sessions are opened while ``tracemalloc``
+traces allocations of sockjs and the aiohttp server, which gives memory per
+session. Then every client sends ``M`` messages one after another and waits
+for each echo, all clients concurrently, which gives round-trip
+percentiles, messages per second and CPU time per message. CPU time is the
+time of the whole process, clients included. Finally ``B`` messages are
+broadcast one at a time and fan-out is timed until every client has
+received the message. Every transport is measured ``R`` times, the median
+of every metric is reported.
+
+Results are printed and, with ``--save``, written as JSON. With
+``--baseline`` they are compared with a saved run and the script exits
+with status 1 if a metric is worse than the baseline by more than its
+threshold, a ratio of the baseline value. Thresholds are taken from
+``--threshold``, then from ``"thresholds"`` of the baseline file, then
+0.3 by default. Latencies depend on the machine, record the baseline on
+the machine which runs the comparison::
+
+    python benchmarks/suite.py --save benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import sockjs
+from sockjs import MsgType
+
+#: metrics and whether a higher value is better
+METRICS = {
+    "bytes_per_session": False,
+    "echo_p50_ms": False,
+    "echo_p99_ms": False,
+    "messages_per_second": True,
+    "cpu_us_per_message": False,
+    "broadcast_p50_ms": False,
+    "broadcast_p99_ms": False,
+}
+DEFAULT_THRESHOLD = 0.3
+SERVER_FILES = (
+    tracemalloc.Filter(True, "*/sockjs/*"),
+    tracemalloc.Filter(True, "*/aiohttp/web*"),
+)
+
+
+async def echo(manager, session, msg):
+    if msg.type == MsgType.MESSAGE:
+        session.send(msg.data)
+
+
+class Client:
+    """SockJS client of a transport, received messages are queued."""
+
+    def __init__(self, http: aiohttp.ClientSession, server: TestServer, sid: str):
+        self.http = http
+        self.server = server
+        self.url = server.make_url("/sockjs/000/%s/" % sid)
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.opened = asyncio.get_running_loop().create_future()
+        self.reader = None
+
+    async def connect(self):
+        self.reader = asyncio.ensure_future(self.read())
+        await self.opened
+
+    async def close(self):
+        if self.reader is not None:
+            self.reader.cancel()
+            await asyncio.gather(self.reader, return_exceptions=True)
+
+    def frame(self, frame: str):
+        if frame == "o":
+            if not self.opened.done():
+                self.opened.set_result(None)
+        elif frame.startswith("a"):
+            for message in json.loads(frame[1:]):
+                self.messages.put_nowait(message)
+
+    async def read(self):
+        raise NotImplementedError
+
+    async def send(self, message: str):
+        resp = await self.http.post(self.url / "xhr_send", data=json.dumps([message]))
+        resp.release()
+
+
+class WebSocketClient(Client):
+    async def read(self):
+        self.ws = await self.http.ws_connect(self.url / "websocket")
+        async for msg in self.ws:
+            self.frame(msg.data)
+
+    async def send(self, message: str):
+        await self.ws.send_str(json.dumps([message]))
+
+    async def close(self):
+        await self.ws.close()
+        await super().close()
+
+
+class RawWebSocketClient(Client):
+    async def read(self):
+        self.ws = await self.http.ws_connect(self.server.make_url("/sockjs/websocket"))
+        self.opened.set_result(None)
+        async for msg in self.ws:
+            self.messages.put_nowait(msg.data)
+
+    async def send(self, message: str):
+        await self.ws.send_str(message)
+
+    async def close(self):
+        await self.ws.close()
+        await super().close()
+
+
+class XHRClient(Client):
+    async def read(self):
+        while True:
+            async with self.http.post(self.url / "xhr") as resp:
+                self.frame((await resp.text()).rstrip("\n"))
+
+
+class JSONPClient(Client):
+    async def read(self):
+        while True:
+            async with self.http.get(self.url / "jsonp", params={"c": "p"}) as resp:
+                body = await resp.text()
+                self.frame(json.loads(body[len('/**/p('):-len(");\r\n")]))
+
+    async def send(self, message: str):
+        resp = await self.http.post(
+            self.url / "jsonp_send", data={"d": json.dumps([message])}
+        )
+        resp.release()
+
+
+class StreamingClient(Client):
+    """Reads frames from lines of a streaming response, reconnects when the
+    server ends the response."""
+
+    method = "POST"
+    path = ""
+    params: dict = {}
+
+    def parse(self, line: bytes):
+        raise NotImplementedError
+
+    async def read(self):
+        while True:
+            async with self.http.request(
+                self.method, self.url / self.path, params=self.params
+            ) as resp:
+                async for line in resp.content:
+                    frame = self.parse(line)
+                    if frame is not None:
+                        self.frame(frame)
+
+
+class XHRStreamingClient(StreamingClient):
+    path = "xhr_streaming"
+
+    def parse(self, line):
+        line = line.rstrip(b"\n")
+        if line and not line.startswith(b"h"):
+            return line.decode()
+
+
+class EventSourceClient(StreamingClient):
+    method = "GET"
+    path = "eventsource"
+
+    def parse(self, line):
+        if line.startswith(b"data: "):
+            return line[6:].rstrip(b"\r\n").decode()
+
+
+class HTMLFileClient(StreamingClient):
+    method = "GET"
+    path = "htmlfile"
+    params = {"c": "p"}
+
+    def parse(self, line):
+        if line.startswith(b'p("'):
+            return json.loads(line[2:].rstrip(b");\n"))
+
+
+CLIENTS = {
+    "websocket": WebSocketClient,
+    "websocket-raw": RawWebSocketClient,
+    "xhr": XHRClient,
+    "xhr_streaming": XHRStreamingClient,
+    "jsonp": JSONPClient,
+    "htmlfile": HTMLFileClient,
+    "eventsource": EventSourceClient,
+}
+TRANSPORTS = list(CLIENTS)
+
+
+def percentile(values, percent: float) -> float:
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+async def run(transport: str, clients: int, messages: int, broadcasts: int):
+    app = web.Application()
+    sockjs.add_endpoint(app, echo, name="bench", disconnect_delay=3600)
+    manager = sockjs.get_manager("bench", app)
+    client_class = CLIENTS[transport]
+
+    async with TestServer(app) as server, aiohttp.ClientSession() as http:
+        # memory of sessions
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot().filter_traces(SERVER_FILES)
+        conns = [client_class(http, server, "s%d" % idx) for idx in range(clients)]
+        await asyncio.gather(*(conn.connect() for conn in conns))
+        after = tracemalloc.take_snapshot().filter_traces(SERVER_FILES)
+        tracemalloc.stop()
+        size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+        # echo round trips
+        rtts = []
+
+        async def echoes(conn: Client):
+            for idx in range(messages):
+                message = "message %d" % idx
+                started = time.perf_counter()
+                await conn.send(message)
+                received = await conn.messages.get()
+                rtts.append(time.perf_counter() - started)
+                assert received == message, (received, message)
+
+        cpu = time.process_time()
+        started = time.perf_counter()
+        await asyncio.gather(*(echoes(conn) for conn in conns))
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu
+
+        # broadcast fan-out
+        fanouts = []
+        for idx in range(broadcasts):
+            started = time.perf_counter()
+            manager.broadcast("broadcast %d" % idx)
+            await asyncio.gather(*(conn.messages.get() for conn in conns))
+            fanouts.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(conn.close() for conn in conns))
+        await manager.clear()
+
+    total = clients * messages
+    return {
+        "bytes_per_session": size / clients,
+        "echo_p50_ms": percentile(rtts, 50) * 1000,
+        "echo_p99_ms": percentile(rtts, 99) * 1000,
+        "messages_per_second": total / elapsed,
+        "cpu_us_per_message": cpu / total * 1000000,
+        "broadcast_p50_ms": percentile(fanouts, 50) * 1000,
+        "broadcast_p99_ms": percentile(fanouts, 99) * 1000,
+    }
+
+
+def regressions(results: dict, baseline: dict, thresholds: dict):
+    """Metrics of results worse than baseline by more than their thresholds."""
+    for transport, base_metrics in baseline["results"].items():
+        metrics = results["results"].get(transport)
+        if metrics is None:
+            continue
+        for metric, base in base_metrics.items():
+            if metric not in METRICS or metric not in metrics or not base:
+                continue
+            value = metrics[metric]
+            change = (base - value if METRICS[metric] else value - base) / base
+            limit = thresholds.get(metric, DEFAULT_THRESHOLD)
+            if change > limit:
+                yield transport, metric, base, value, change, limit
+
+
+def parse_thresholds(args) -> dict:
+    thresholds = {}
+    for arg in args:
+        metric, _, ratio = arg.rpartition("=")
+        if metric and metric not in METRICS:
+            raise SystemExit("unknown metric %r" % metric)
+        thresholds[metric or None] = float(ratio)
+    return thresholds
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--broadcasts", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--transport", action="append", choices=TRANSPORTS, dest="transports"
+    )
+    parser.add_argument("--save", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", action="append", default=[])
+    args = parser.parse_args(argv)
+    thresholds = parse_thresholds(args.threshold)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "aiohttp": aiohttp.__version__,
+            "platform": platform.platform(),
+            "clients": args.clients,
+            "messages": args.messages,
+            "broadcasts": args.broadcasts,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    print("%-14s" % "transport" + "".join("%20s" % metric for metric in METRICS))
+    for transport in args.transports or TRANSPORTS:
+        runs = [
+            asyncio.run(run(transport, args.clients, args.messages, args.broadcasts))
+            for _ in range(args.repeat)
+        ]
+        metrics = {
+            metric: statistics.median(values[metric] for values in runs)
+            for metric in METRICS
+        }
+        results["results"][transport] = metrics
+        print(
+            "%-14s" % transport
+            + "".join("%20.3f" % metrics[metric] for metric in METRICS)
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        limits = dict(baseline.get("thresholds", {}))
+        if None in thresholds:
+            limits = dict.fromkeys(METRICS, thresholds.pop(None))
+        limits.update(thresholds)
+        failed = list(regressions(results, baseline, limits))
+        for transport, metric, base, value, change, limit in failed:
+            print(
+                "REGRESSION %s %s: %.3f -> %.3f (%+.0f%%, threshold %.0f%%)"
+                % (transport, metric, base, value, change * 100, limit * 100)
+            )
+        if failed:
+            return 1
+        print("no regressions against %s" % args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
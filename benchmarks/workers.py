@@ -0,0 +1,138 @@
+"""Polling round trips served by one worker and by several workers.
+
+Run::
+
+    python benchmarks/workers.py [WORKERS [CLIENTS [SECONDS]]]
+
+A server is started with ``run_workers()`` on a local port, first with one
+worker and then with ``WORKERS`` workers. ``CLIENTS`` xhr-polling sessions
+in 4 client processes send a message with ``xhr_send`` and read the echo
+with ``xhr`` for ``SECONDS``. Requests accepted by a worker that does not
+own the session are forwarded, with N workers that is (N - 1) / N of them.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+import sockjs
+
+CLIENT_PROCESSES = 4
+
+
+async def echo(manager, session, msg):
+    if msg.type == sockjs.MsgType.MESSAGE:
+        session.send(msg.data)
+
+
+def make_app(group):
+    app = web.Application()
+    sockjs.add_endpoint(app, echo, name="bench", workers=group)
+    return app
+
+
+def serve(workers, port):
+    sockjs.run_workers(
+        make_app,
+        workers=workers,
+        host="127.0.0.1",
+        port=port,
+        broker=False,
+        print=None,
+        access_log=None,
+    )
+
+
+async def client_session(client, url, idx, deadline):
+    base = "%s/sockjs/%03d/c%d-%d" % (url, idx % 1000, os.getpid(), idx)
+    async with client.post(base + "/xhr") as resp:
+        assert await resp.read() == b"o\n"
+    rounds = 0
+    while time.perf_counter() < deadline:
+        async with client.post(base + "/xhr_send", data=b'["ping"]') as resp:
+            assert resp.status == 204
+        async with client.post(base + "/xhr") as resp:
+            assert await resp.read() == b'a["ping"]\n'
+        rounds += 1
+    return rounds
+
+
+async def client_main(url, clients, seconds):
+    deadline = time.perf_counter() + seconds
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        rounds = await asyncio.gather(
+            *(client_session(client, url, idx, deadline) for idx in range(clients))
+        )
+    return sum(rounds)
+
+
+def client_process(url, clients, seconds, results):
+    results.put(asyncio.run(client_main(url, clients, seconds)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_port(port):
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    raise RuntimeError("server is not started")
+
+
+def run(workers, clients, seconds):
+    ctx = multiprocessing.get_context("spawn")
+    port = free_port()
+    server = ctx.Process(target=serve, args=(workers, port))
+    server.start()
+    try:
+        wait_port(port)
+        time.sleep(0.5)  # all workers are listening
+        url = "http://127.0.0.1:%d" % port
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(
+                target=client_process,
+                args=(url, clients // CLIENT_PROCESSES, seconds, results),
+            )
+            for _ in range(CLIENT_PROCESSES)
+        ]
+        for proc in procs:
+            proc.start()
+        rounds = sum(results.get() for _ in procs)
+        for proc in procs:
+            proc.join()
+    finally:
+        server.terminate()
+        server.join()
+    return rounds / seconds
+
+
+def main(workers, clients, seconds):
+    print(
+        "%d clients in %d processes, %d seconds"
+        % (clients, CLIENT_PROCESSES, seconds)
+    )
+    print("%8s %14s %14s" % ("workers", "round trips/s", "requests/s"))
+    for count in sorted({1, workers}):
+        rate = run(count, clients, seconds)
+        print("%8d %14.0f %14.0f" % (count, rate, rate * 2))
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    defaults = [os.cpu_count() or 2, 200, 5]
+    main(*args, *defaults[len(args):])
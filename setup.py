@@ -45,7 +45,7 @@ setup(
     packages=find_packages(),
     python_requires=">=3.10.0",
     install_requires=[
-        "aiohttp>=3.7.4",
+        "aiohttp>=3.11.0",
         "async-timeout>=4.0.3",
     ],
     extras_require={
@@ -1,7 +1,29 @@
+from .bus import Bus, LocalBroker, LocalBus, UnixSocketBroker, UnixSocketBus
+from .codec import Codec, JSONCodec, MsgspecCodec, OrjsonCodec
+from .dispatch import InboundLimits
+from .executor import HandlerExecutor
 from .exceptions import SessionIsAcquired, SessionIsClosed
+from .metrics import Metrics
 from .protocol import SessionState, MsgType, Frame, SockjsMessage
 from .route import add_endpoint, get_manager
-from .session import Session, SessionManager
+from .session import (
+    BatchWindow,
+    OverflowPolicy,
+    Priority,
+    QueueLimits,
+    Session,
+    SessionManager,
+)
+from .store import MemoryStore, RemoteSession, SessionStore, SQLiteStore
+from .tracing import (
+    JSONLSink,
+    LatencyTracer,
+    SamplingTracer,
+    Span,
+    SpanSink,
+    Tracer,
+)
+from .workers import WorkerGroup, run_workers
 
 
 __version__ = "0.13.0"
@@ -9,8 +31,36 @@ __version__ = "0.13.0"
 __all__ = (
     "get_manager",
     "add_endpoint",
+    "run_workers",
+    "WorkerGroup",
     "Session",
     "SessionManager",
+    "QueueLimits",
+    "OverflowPolicy",
+    "BatchWindow",
+    "InboundLimits",
+    "HandlerExecutor",
+    "Metrics",
+    "Tracer",
+    "SamplingTracer",
+    "LatencyTracer",
+    "Span",
+    "SpanSink",
+    "JSONLSink",
+    "Priority",
+    "SessionStore",
+    "MemoryStore",
+    "SQLiteStore",
+    "RemoteSession",
+    "Bus",
+    "LocalBroker",
+    "LocalBus",
+    "UnixSocketBroker",
+    "UnixSocketBus",
+    "Codec",
+    "JSONCodec",
+    "OrjsonCodec",
+    "MsgspecCodec",
     "SessionIsClosed",
     "SessionIsAcquired",
     "SessionState",
@@ -0,0 +1,250 @@
+import abc
+import asyncio
+import dataclasses
+import enum
+import json
+import logging
+import os
+import struct
+from typing import TYPE_CHECKING, Optional
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import SessionManager
+
+
+log = logging.getLogger("sockjs")
+
+
+@enum.unique
+class BusMessageType(enum.Enum):
+    BROADCAST = 1
+    PUBLISH = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class BusMessage:
+    """Encoded message frame sent to sessions of other processes.
+
+    ``channel`` is the name of the ``SessionManager``, ``topic`` is set for
+    ``BusMessageType.PUBLISH``, ``exclude`` are ids of sessions that must
+    not receive the frame.
+    """
+
+    type: BusMessageType
+    channel: str
+    frame: bytes
+    topic: Optional[str] = None
+    exclude: tuple[str, ...] = ()
+
+
+class Bus(abc.ABC):
+    """Publish/subscribe channel between session managers of processes.
+
+    Messages published during one event loop iteration are sent to other
+    nodes of the bus as one batch. A node never receives its own messages,
+    managers deliver them to their sessions directly.
+    """
+
+    def __init__(self):
+        self.managers: dict[str, "SessionManager"] = {}
+        self.sent = 0
+        self.received = 0
+        self._pending: list[BusMessage] = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+
+    def subscribe(self, manager: "SessionManager"):
+        self.managers[manager.name] = manager
+
+    def publish(self, message: BusMessage):
+        self._pending.append(message)
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        self._flush_handle = None
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self.sent += len(batch)
+            self._send(batch)
+
+    async def start(self, _app=None):
+        pass
+
+    async def close(self, _app=None):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self.flush()
+
+    @abc.abstractmethod
+    def _send(self, batch: list[BusMessage]):
+        pass
+
+    def deliver(self, batch: list[BusMessage]):
+        """Send frames received from other nodes to local sessions."""
+        self.received += len(batch)
+        for message in batch:
+            manager = self.managers.get(message.channel)
+            if manager is not None:
+                manager.deliver_bus_message(message)
+
+
+# In-process backend
+# ------------------
+
+
+class LocalBroker:
+    """Connects ``LocalBus`` nodes of one process, e.g. in tests."""
+
+    def __init__(self):
+        self.nodes: list["LocalBus"] = []
+
+    def forward(self, sender: "LocalBus", batch: list[BusMessage]):
+        for node in self.nodes:
+            if node is not sender:
+                node.deliver(batch)
+
+
+class LocalBus(Bus):
+    def __init__(self, broker: LocalBroker):
+        super().__init__()
+        self.broker = broker
+        broker.nodes.append(self)
+
+    def _send(self, batch: list[BusMessage]):
+        self.broker.forward(self, batch)
+
+    async def close(self, _app=None):
+        await super().close()
+        if self in self.broker.nodes:
+            self.broker.nodes.remove(self)
+
+
+# Unix domain socket backend
+# --------------------------
+
+# record: length of header, length of frame, JSON header, frame
+_RECORD = struct.Struct("!II")
+
+
+def encode_batch(batch: list[BusMessage]) -> bytes:
+    records = []
+    for message in batch:
+        header = json.dumps(
+            [message.type.value, message.channel, message.topic, message.exclude],
+            separators=(",", ":"),
+        ).encode()
+        records.append(_RECORD.pack(len(header), len(message.frame)))
+        records.append(header)
+        records.append(message.frame)
+    return b"".join(records)
+
+
+async def read_record(reader: asyncio.StreamReader) -> bytes:
+    """Read one encoded record, raises IncompleteReadError at EOF."""
+    prefix = await reader.readexactly(_RECORD.size)
+    header_size, frame_size = _RECORD.unpack(prefix)
+    return prefix + await reader.readexactly(header_size + frame_size)
+
+
+def decode_record(record: bytes) -> BusMessage:
+    header_size, _ = _RECORD.unpack_from(record)
+    start = _RECORD.size + header_size
+    tp, channel, topic, exclude = json.loads(record[_RECORD.size:start])
+    return BusMessage(
+        BusMessageType(tp), channel, record[start:], topic, tuple(exclude)
+    )
+
+
+class UnixSocketBroker:
+    """Broker of ``UnixSocketBus`` nodes listening on a unix socket.
+
+    Records are forwarded to all other connected nodes without decoding
+    frames, records received in one event loop iteration are written with
+    one write per node.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: dict[asyncio.StreamWriter, list[bytes]] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, self.path)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers[writer] = []
+        try:
+            while True:
+                record = await read_record(reader)
+                for other, pending in self._writers.items():
+                    if other is not writer:
+                        pending.append(record)
+                if self._flush_handle is None:
+                    loop = asyncio.get_running_loop()
+                    self._flush_handle = loop.call_soon(self._flush)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self._writers[writer]
+            writer.close()
+
+    def _flush(self):
+        self._flush_handle = None
+        for writer, pending in self._writers.items():
+            if pending:
+                writer.write(b"".join(pending))
+                pending.clear()
+
+
+class UnixSocketBus(Bus):
+    """Node of a bus connected to ``UnixSocketBroker``."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def start(self, _app=None):
+        if self._writer is None:
+            reader, self._writer = await asyncio.open_unix_connection(self.path)
+            self._reader_task = asyncio.create_task(self._read(reader))
+            self.flush()
+
+    async def close(self, _app=None):
+        await super().close()
+        if self._writer is not None:
+            await self._writer.drain()
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+
+    def flush(self):
+        # messages published before start() are sent on connect
+        if self._writer is not None:
+            super().flush()
+
+    def _send(self, batch: list[BusMessage]):
+        self._writer.write(encode_batch(batch))
+
+    async def _read(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                self.deliver([decode_record(await read_record(reader))])
+        except asyncio.IncompleteReadError:
+            log.warning("Connection to the bus broker %s is closed", self.path)
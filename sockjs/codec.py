@@ -0,0 +1,123 @@
+import abc
+import re
+from typing import Any, Union
+
+from .protocol import ENCODING, Frame, dumps, loads
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+_MESSAGE = Frame.MESSAGE.value.encode(ENCODING)
+_CLOSE = Frame.CLOSE.value.encode(ENCODING)
+
+# UTF-8 of characters SockJS clients require escaped: U+200C-U+200F,
+# U+2028-U+202F, U+2060-U+206F and U+FFF0-U+FFFF
+_ESCAPABLE = re.compile(
+    rb"\xe2\x80[\x8c-\x8f\xa8-\xaf]|\xe2\x81[\xa0-\xaf]|\xef\xbf[\xb0-\xbf]"
+)
+
+
+def _escape_char(match: re.Match) -> bytes:
+    return b"\\u%04x" % ord(match.group().decode(ENCODING))
+
+
+def _escape(data: bytes) -> bytes:
+    """Escape characters of encoded JSON like ``escape_selected`` of
+    sockjs-node, libraries other than ``json`` leave them raw."""
+    # searching for lead bytes is much faster than the expression
+    if b"\xe2" in data or b"\xef" in data:
+        return _ESCAPABLE.sub(_escape_char, data)
+    return data
+
+
+class Codec(abc.ABC):
+    """JSON codec of messages of an endpoint.
+
+    Subclasses implement ``dumps()`` returning encoded JSON and ``loads()``
+    accepting both ``bytes`` and ``str``, frames are built from
+    ``dumps()``. Characters U+200C-U+200F, U+2028-U+202F, U+2060-U+206F
+    and U+FFF0-U+FFFF must be escaped in the output of ``dumps()``.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def loads(self, data: Union[bytes, str]) -> Any:
+        pass
+
+    def message_frame(self, message) -> bytes:
+        return _MESSAGE + self.dumps([message])
+
+    def messages_frame(self, messages) -> bytes:
+        return _MESSAGE + self.dumps(messages)
+
+    def close_frame(self, code, reason) -> bytes:
+        return _CLOSE + self.dumps([code, reason])
+
+
+class JSONCodec(Codec):
+    """``dumps()`` and ``loads()`` of ``sockjs.protocol``."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return dumps(obj).encode(ENCODING)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return loads(data)
+
+
+class OrjsonCodec(Codec):
+    """Codec of `orjson <https://github.com/ijl/orjson>`_.
+
+    ``datetime`` objects are encoded in RFC 3339 format.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("orjson is required for OrjsonCodec")
+
+    def dumps(self, obj: Any) -> bytes:
+        return _escape(orjson.dumps(obj))
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecCodec(Codec):
+    """Codec of `msgspec <https://jcristharif.com/msgspec/>`_.
+
+    ``datetime`` objects are encoded in RFC 3339 format.
+    """
+
+    name = "msgspec"
+
+    def __init__(self):
+        if msgspec is None:
+            raise RuntimeError("msgspec is required for MsgspecCodec")
+        self._encode = msgspec.json.Encoder().encode
+        self._decode = msgspec.json.Decoder().decode
+
+    def dumps(self, obj: Any) -> bytes:
+        return _escape(self._encode(obj))
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._decode(data)
+
+
+DEFAULT_CODEC = JSONCodec()
@@ -0,0 +1,120 @@
+import asyncio
+import dataclasses
+from collections import deque
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+from .protocol import SockjsMessage
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import Session
+
+
+@dataclasses.dataclass(frozen=True)
+class InboundLimits:
+    """Limits of handler calls with messages received from clients.
+
+    ``max_messages`` is the size of the inbound queue of a session,
+    ``max_handlers`` is the number of handlers running concurrently for
+    all sessions of a manager, unlimited if None.
+    """
+
+    max_messages: int = 100
+    max_handlers: Optional[int] = None
+
+
+class _Inbox:
+    __slots__ = ("messages", "task", "waiters")
+
+    def __init__(self):
+        self.messages: deque[SockjsMessage] = deque()
+        self.task: Optional[asyncio.Task] = None
+        self.waiters: deque[asyncio.Future] = deque()
+
+
+class InboundDispatcher:
+    """Calls the handler with inbound messages outside of transports.
+
+    Messages of a session are queued and passed to ``call`` in order by
+    a task of the session, which exists while the queue is not empty.
+    ``put()`` waits while ``limits.max_messages`` messages of the session
+    are queued, so a transport stops reading and TCP applies backpressure
+    to the client. Close messages are queued without waiting, after the
+    messages received before them.
+    """
+
+    def __init__(
+        self,
+        limits: InboundLimits,
+        call: Callable[["Session", SockjsMessage], Awaitable],
+    ):
+        self.limits = limits
+        self.call = call
+        self._inboxes: dict["Session", _Inbox] = {}
+        self._semaphore = (
+            asyncio.Semaphore(limits.max_handlers)
+            if limits.max_handlers is not None
+            else None
+        )
+
+    def __len__(self):
+        return len(self._inboxes)
+
+    def queued(self, session: "Session") -> int:
+        inbox = self._inboxes.get(session)
+        return 0 if inbox is None else len(inbox.messages)
+
+    async def put(self, session: "Session", message: SockjsMessage, wait=True):
+        while True:
+            inbox = self._inboxes.get(session)
+            if inbox is None:
+                inbox = self._inboxes[session] = _Inbox()
+            if not wait or len(inbox.messages) < self.limits.max_messages:
+                break
+            waiter = asyncio.get_running_loop().create_future()
+            inbox.waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in inbox.waiters:
+                    inbox.waiters.remove(waiter)
+        inbox.messages.append(message)
+        if inbox.task is None:
+            inbox.task = asyncio.create_task(self._run(session, inbox))
+
+    async def _run(self, session: "Session", inbox: _Inbox):
+        try:
+            while inbox.messages:
+                message = inbox.messages.popleft()
+                if inbox.waiters:
+                    waiter = inbox.waiters.popleft()
+                    if not waiter.done():
+                        waiter.set_result(None)
+                if self._semaphore is None:
+                    await self.call(session, message)
+                else:
+                    async with self._semaphore:
+                        await self.call(session, message)
+        finally:
+            inbox.task = None
+            if self._inboxes.get(session) is inbox:
+                if inbox.messages:
+                    # cancelled, waiting senders are released
+                    inbox.messages.clear()
+                for waiter in inbox.waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+                del self._inboxes[session]
+
+    async def join(self):
+        """Wait until queued messages of all sessions are handled."""
+        while self._inboxes:
+            tasks = [inbox.task for inbox in self._inboxes.values() if inbox.task]
+            if not tasks:
+                break
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def cancel(self):
+        for inbox in list(self._inboxes.values()):
+            if inbox.task is not None:
+                inbox.task.cancel()
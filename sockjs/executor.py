@@ -0,0 +1,170 @@
+import asyncio
+import os
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Callable, Optional, Type
+
+from .protocol import MsgType, SessionState, SockjsMessage
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import Session, SessionManager
+
+
+# calls a handler may make in an executor, performed by the event loop
+_SESSION_CALLS = ("send", "send_conflated", "close")
+_MANAGER_CALLS = ("broadcast", "publish", "publish_conflated")
+
+
+class _Calls(list):
+    """Calls recorded in a worker process, applied after the handler."""
+
+
+class _LoopCalls:
+    """Calls made in a worker thread, forwarded to the event loop at once."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, manager, session):
+        self.loop = loop
+        self.manager = manager
+        self.session = session
+
+    def append(self, call):
+        self.loop.call_soon_threadsafe(_apply, self.manager, self.session, call)
+
+
+def _apply(manager: "SessionManager", session: "Session", call):
+    target, name, args, kwargs = call
+    getattr(session if target == "session" else manager, name)(*args, **kwargs)
+
+
+class SessionProxy:
+    """Session as seen by a handler running in ``HandlerExecutor``.
+
+    ``send()``, ``send_conflated()`` and ``close()`` are performed by the
+    event loop: immediately for threads, after the handler returns for
+    processes. ``state`` is the state of the session when the handler
+    has been called.
+    """
+
+    def __init__(self, session_id: str, state: SessionState, calls):
+        self.id = session_id
+        self.state = state
+        self._calls = calls
+
+    def __getattr__(self, name):
+        if name not in _SESSION_CALLS:
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            self._calls.append(("session", name, args, kwargs))
+
+        return call
+
+
+class ManagerProxy:
+    """Session manager as seen by a handler running in ``HandlerExecutor``,
+    ``broadcast()``, ``publish()`` and ``publish_conflated()`` are performed
+    by the event loop."""
+
+    def __init__(self, name: str, calls):
+        self.name = name
+        self._calls = calls
+
+    def __getattr__(self, name):
+        if name not in _MANAGER_CALLS:
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            self._calls.append(("manager", name, args, kwargs))
+
+        return call
+
+
+def _call_handler(
+    handler, manager_name, session_id, state, msg: SockjsMessage, calls=None
+):
+    if calls is None:
+        calls = _Calls()
+    manager = ManagerProxy(manager_name, calls)
+    handler(manager, SessionProxy(session_id, state, calls), msg)
+    return calls if isinstance(calls, _Calls) else None
+
+
+class HandlerExecutor:
+    """Runs sync handlers in ``workers`` threads or processes.
+
+    Every worker is an executor of ``executor_class`` with one worker and
+    a session is pinned to a worker by a hash of its id, so messages of
+    a session are handled in order. Handlers receive a ``ManagerProxy`` and
+    a ``SessionProxy``, with ``ProcessPoolExecutor`` the handler and
+    messages must be picklable. The exception of a ``MsgType.CLOSE``
+    message is passed to processes as its ``repr()``, and a worker process
+    that has died is replaced by a new one.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        executor_class: Type[Executor] = ThreadPoolExecutor,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor_class = executor_class
+        self.processes = issubclass(executor_class, ProcessPoolExecutor)
+        self._executors: list[Optional[Executor]] = [None] * self.workers
+
+    def executor_for(self, session_id: str) -> Executor:
+        idx = zlib.crc32(session_id.encode()) % self.workers
+        executor = self._executors[idx]
+        if executor is None:
+            executor = self._executors[idx] = self.executor_class(max_workers=1)
+        return executor
+
+    def _replace(self, executor: Executor):
+        try:
+            idx = self._executors.index(executor)
+        except ValueError:
+            return
+        self._executors[idx] = None
+        executor.shutdown(wait=False)
+
+    def wrap(self, handler: Callable) -> Callable:
+        """Coroutine function calling sync ``handler`` in the executor."""
+
+        async def run_handler(manager, session, msg):
+            loop = asyncio.get_running_loop()
+            executor = self.executor_for(session.id)
+            if self.processes:
+                calls = None
+                if msg.type == MsgType.CLOSE and msg.data is not None:
+                    # transport exceptions can't be pickled
+                    msg = SockjsMessage(MsgType.CLOSE, repr(msg.data))
+            else:
+                calls = _LoopCalls(loop, manager, session)
+            try:
+                calls = await loop.run_in_executor(
+                    executor,
+                    _call_handler,
+                    handler,
+                    manager.name,
+                    session.id,
+                    session.state,
+                    msg,
+                    calls,
+                )
+            except BrokenProcessPool:
+                self._replace(executor)
+                raise
+            for call in calls or ():
+                _apply(manager, session, call)
+
+        return run_handler
+
+    def shutdown(self, wait=True):
+        executors, self._executors = self._executors, [None] * self.workers
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=wait)
+
+    async def close(self, _app=None):
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
@@ -0,0 +1,142 @@
+import asyncio
+import heapq
+import math
+import random
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Optional
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import Session
+
+
+class HeartbeatScheduler:
+    """Heartbeats and websocket pong timeouts of all sessions of a manager.
+
+    Deadlines are rounded up to slots of ``resolution`` seconds and a single
+    timer fires the earliest slot. Heartbeats are delayed by a random
+    ``jitter`` so that sessions opened together do not share one slot.
+    Sessions of a fired slot are handled in batches of ``batch_size``
+    per event loop iteration.
+
+    ``clock`` must be the clock of the sessions, deadlines of
+    ``Session.next_heartbeat`` are compared with its values directly.
+    """
+
+    def __init__(
+        self,
+        resolution=0.5,
+        jitter=2.0,
+        batch_size=1000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.clock = clock
+        self.resolution = resolution
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.heartbeats = 0
+        self.pong_timeouts = 0
+        self._heartbeats: dict["Session", int] = {}
+        self._pongs: dict["Session", int] = {}
+        self._slots: dict[int, list[tuple[dict, "Session"]]] = {}
+        self._order: list[int] = []
+        self._pending: deque[tuple[int, dict, "Session"]] = deque()
+        self._timer: Optional[asyncio.Handle] = None
+        self._timer_slot: Optional[int] = None
+
+    def __len__(self):
+        return len(self._heartbeats)
+
+    def __contains__(self, session: "Session"):
+        return session in self._heartbeats
+
+    def add(self, session: "Session"):
+        """Start sending heartbeats to an acquired session."""
+        if session._send_heartbeats and session not in self._heartbeats:
+            self._schedule_heartbeat(session)
+
+    def discard(self, session: "Session"):
+        """Stop sending heartbeats and waiting for pong of a session."""
+        self._heartbeats.pop(session, None)
+        self._pongs.pop(session, None)
+
+    def wait_pong(self, session: "Session", timeout: float):
+        """Close session if no message is received in ``timeout`` seconds."""
+        if session not in self._pongs:
+            self._insert(self._pongs, session, self.clock() + timeout)
+
+    def pong(self, session: "Session"):
+        """A message from the client of a session has been received."""
+        self._pongs.pop(session, None)
+
+    def clear(self):
+        self._heartbeats.clear()
+        self._pongs.clear()
+        self._slots.clear()
+        self._order.clear()
+        self._pending.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._timer_slot = None
+
+    def _schedule_heartbeat(self, session: "Session"):
+        when = session.next_heartbeat + random.random() * self.jitter
+        self._insert(self._heartbeats, session, when)
+
+    def _insert(self, registry: dict, session: "Session", when: float):
+        slot = math.ceil(when / self.resolution)
+        registry[session] = slot
+        entries = self._slots.get(slot)
+        if entries is None:
+            entries = self._slots[slot] = []
+            heapq.heappush(self._order, slot)
+        entries.append((registry, session))
+        self._arm()
+
+    def _arm(self):
+        if self._pending or not self._order:
+            return
+        slot = self._order[0]
+        if self._timer is not None:
+            if self._timer_slot == slot:
+                return
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        delay = max(slot * self.resolution - self.clock(), 0)
+        self._timer = loop.call_later(delay, self._run)
+        self._timer_slot = slot
+
+    def _run(self):
+        self._timer = self._timer_slot = None
+        loop = asyncio.get_running_loop()
+
+        # a timer can fire slightly before its time
+        now = self.clock()
+        limit = (now + 0.001) / self.resolution
+        order = self._order
+        while order and order[0] <= limit:
+            slot = heapq.heappop(order)
+            for registry, session in self._slots.pop(slot):
+                self._pending.append((slot, registry, session))
+
+        pending = self._pending
+        for _ in range(min(self.batch_size, len(pending))):
+            slot, registry, session = pending.popleft()
+            if registry.get(session) != slot:
+                continue
+            del registry[session]
+
+            if registry is self._pongs:
+                self.pong_timeouts += 1
+                session.close(3000, "No response from heartbeat")
+            elif session._send_heartbeats:
+                if session.next_heartbeat <= now:
+                    session.heartbeat()
+                    self.heartbeats += 1
+                self._schedule_heartbeat(session)
+
+        if pending:
+            self._timer = loop.call_soon(self._run)
+        else:
+            self._arm()
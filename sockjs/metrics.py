@@ -0,0 +1,169 @@
+import bisect
+from collections import Counter
+from typing import TYPE_CHECKING, Iterable
+
+from aiohttp import web
+
+from .protocol import MsgType
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import SessionManager
+
+
+DURATION_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0
+)  # fmt: skip
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds of buckets."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Iterable[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str):
+        """Lines of the histogram in Prometheus text format."""
+        sep = "," if labels else ""
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            yield '%s_bucket{%s%sle="%s"} %d' % (name, labels, sep, bound, total)
+        yield '%s_bucket{%s%sle="+Inf"} %d' % (name, labels, sep, self.count)
+        yield "%s_sum{%s} %s" % (name, labels, self.sum)
+        yield "%s_count{%s} %d" % (name, labels, self.count)
+
+
+class Metrics:
+    """Counters of a ``SessionManager``.
+
+    Counters and histograms of the hot path are plain attributes updated
+    by the manager and transports. Session counts and queue depths are
+    collected from sessions when the metrics are rendered.
+    """
+
+    def __init__(self):
+        self.messages_received = 0
+        self.bytes_received: Counter[str] = Counter()
+        self.frames_sent: Counter[str] = Counter()
+        self.bytes_sent: Counter[str] = Counter()
+        self.handler_duration = {tp: Histogram(DURATION_BUCKETS) for tp in MsgType}
+        self.gc_duration = Histogram(DURATION_BUCKETS)
+
+    def received(self, transport: str, size: int):
+        self.bytes_received[transport] += size
+
+    def sent(self, transport: str, size: int, frames: int = 1):
+        self.frames_sent[transport] += frames
+        self.bytes_sent[transport] += size
+
+
+def _labels(**labels) -> str:
+    return ",".join('%s="%s"' % item for item in labels.items())
+
+
+FAMILIES = (
+    (
+        "sockjs_sessions",
+        "gauge",
+        "Sessions by state and transport, empty without a connection.",
+    ),
+    ("sockjs_messages_received_total", "counter", "Messages received."),
+    ("sockjs_bytes_received_total", "counter", "Bytes received."),
+    ("sockjs_frames_sent_total", "counter", "Frames sent."),
+    ("sockjs_bytes_sent_total", "counter", "Bytes sent."),
+    ("sockjs_queue_depth", "histogram", "Frames queued in sessions."),
+    ("sockjs_handler_duration_seconds", "histogram", "Duration of handler calls."),
+    ("sockjs_gc_duration_seconds", "histogram", "Duration of session GC passes."),
+    ("sockjs_heartbeats_total", "counter", "Heartbeats sent."),
+    (
+        "sockjs_pong_timeouts_total",
+        "counter",
+        "Sessions closed without a websocket pong.",
+    ),
+)
+
+
+def collect(manager: "SessionManager") -> dict[str, list[str]]:
+    """Samples of metrics of a manager in Prometheus text format."""
+    metrics = manager.metrics
+    name = manager.name
+    endpoint = _labels(endpoint=name)
+    samples: dict[str, list[str]] = {family: [] for family, _, _ in FAMILIES}
+
+    sessions: Counter[tuple[str, str]] = Counter()
+    depth = Histogram(DEPTH_BUCKETS)
+    for session in manager.sessions.values():
+        request = session.request
+        transport = request.get("sockjs_transport_name", "") if request else ""
+        sessions[session.state.name.lower(), transport] += 1
+        depth.observe(sum(session.queue_depths.values()))
+    for (state, transport), count in sorted(sessions.items()):
+        labels = _labels(endpoint=name, state=state, transport=transport)
+        samples["sockjs_sessions"].append("sockjs_sessions{%s} %d" % (labels, count))
+
+    samples["sockjs_messages_received_total"].append(
+        "sockjs_messages_received_total{%s} %d" % (endpoint, metrics.messages_received)
+    )
+    for family, counter in (
+        ("sockjs_bytes_received_total", metrics.bytes_received),
+        ("sockjs_frames_sent_total", metrics.frames_sent),
+        ("sockjs_bytes_sent_total", metrics.bytes_sent),
+    ):
+        for transport, value in sorted(counter.items()):
+            labels = _labels(endpoint=name, transport=transport)
+            samples[family].append("%s{%s} %d" % (family, labels, value))
+
+    samples["sockjs_queue_depth"].extend(depth.samples("sockjs_queue_depth", endpoint))
+    for tp, histogram in metrics.handler_duration.items():
+        labels = _labels(endpoint=name, type=tp.name.lower())
+        samples["sockjs_handler_duration_seconds"].extend(
+            histogram.samples("sockjs_handler_duration_seconds", labels)
+        )
+    samples["sockjs_gc_duration_seconds"].extend(
+        metrics.gc_duration.samples("sockjs_gc_duration_seconds", endpoint)
+    )
+
+    scheduler = manager.heartbeat_scheduler
+    for family, value in (
+        ("sockjs_heartbeats_total", scheduler.heartbeats),
+        ("sockjs_pong_timeouts_total", scheduler.pong_timeouts),
+    ):
+        samples[family].append("%s{%s} %d" % (family, endpoint, value))
+    return samples
+
+
+def render(managers: Iterable["SessionManager"]) -> str:
+    """Metrics of managers in Prometheus text format."""
+    collected = [
+        collect(manager) for manager in managers if manager.metrics is not None
+    ]
+    lines = []
+    for family, tp, help in FAMILIES:
+        lines.append("# HELP %s %s" % (family, help))
+        lines.append("# TYPE %s %s" % (family, tp))
+        for samples in collected:
+            lines.extend(samples[family])
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Metrics of all endpoints of the application."""
+    managers = request.app.get("__sockjs_managers__", {}).values()
+    return web.Response(
+        text=render(managers),
+        content_type="text/plain",
+        charset="utf-8",
+        headers={"Cache-Control": "no-cache"},
+    )
@@ -2,7 +2,8 @@ import dataclasses
 import enum
 import hashlib
 from datetime import datetime
-from typing import Union
+from json.encoder import encode_basestring_ascii as _quote
+from typing import Any, Callable, Hashable, Union
 
 
 ENCODING = "utf-8"
@@ -108,16 +109,45 @@ def dumps(data):
     return json.dumps(data, **kwargs)
 
 
-def close_frame(code, reason):
-    return Frame.CLOSE.value + json.dumps([code, reason], **kwargs)
+def close_frame(code, reason) -> bytes:
+    return (Frame.CLOSE.value + json.dumps([code, reason], **kwargs)).encode(ENCODING)
 
 
-def message_frame(message):
-    return Frame.MESSAGE.value + json.dumps([message], **kwargs)
+def message_frame(message) -> bytes:
+    return (Frame.MESSAGE.value + json.dumps([message], **kwargs)).encode(ENCODING)
 
 
-def messages_frame(messages):
-    return Frame.MESSAGE.value + json.dumps(messages, **kwargs)
+def messages_frame(messages) -> bytes:
+    return (Frame.MESSAGE.value + json.dumps(messages, **kwargs)).encode(ENCODING)
+
+
+def quote_frame(frame: bytes) -> bytes:
+    """Encoded frame as a JavaScript string literal."""
+    return _quote(frame.decode(ENCODING)).encode(ENCODING)
+
+
+class FrameBlob(bytes):
+    """Packed frame shared by many sessions.
+
+    Transports keep the wire form of the frame in the blob, so every wire
+    form is produced once and is reused for all sessions the frame has been
+    sent to.
+    """
+
+    def wire(self, key: Hashable, encode: Callable[[bytes], Any]):
+        try:
+            cache = self._wire
+        except AttributeError:
+            cache = self._wire = {}
+
+        data = cache.get(key)
+        if data is None:
+            data = cache[key] = encode(self)
+        return data
+
+
+OPEN_FRAME = FrameBlob(b"o")
+HEARTBEAT_FRAME = FrameBlob(b"h")
 
 
 # Handler messages
@@ -130,12 +160,15 @@ class MsgType(enum.Enum):
     MESSAGE = 2
     CLOSE = 3
     CLOSED = 4
+    #: list of messages of one payload, see ``batch_messages`` of
+    #: ``SessionManager``
+    MESSAGES = 5
 
 
 @dataclasses.dataclass(frozen=True)
 class SockjsMessage:
     type: MsgType
-    data: Union[str, Exception, None]
+    data: Union[str, list, Exception, None]
 
     @property
     def tp(self) -> MsgType:
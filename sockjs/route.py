@@ -15,12 +15,20 @@ try:
 except ImportError:
     CorsConfig = None
 
+from .bus import Bus
+from .codec import DEFAULT_CODEC, Codec
+from .dispatch import InboundLimits
+from .executor import HandlerExecutor
+from .metrics import Metrics, metrics_handler
 from .protocol import IFRAME_HTML
-from .session import SessionManager, HandlerType
+from .session import BatchWindow, SessionManager, HandlerType, QueueLimits
+from .store import SessionStore
 from .transports import transport_handlers
 from .transports.base import Transport
 from .transports.rawwebsocket import RawWebSocketTransport
+from .tracing import Tracer
 from .transports.utils import CACHE_CONTROL, cache_headers, session_cookie
+from .workers import WorkerGroup
 
 
 log = logging.getLogger("sockjs")
@@ -48,13 +56,31 @@ def add_endpoint(
     cors_config: Optional[CorsConfig] = None,
     heartbeat_delay=25,
     disconnect_delay=5,
+    heartbeat_resolution=0.5,
+    heartbeat_jitter=2.0,
+    queue_limits: Optional[QueueLimits] = None,
+    codec: Codec = DEFAULT_CODEC,
+    batch_window: Optional[BatchWindow] = None,
+    bus: Optional[Bus] = None,
+    workers: Optional[WorkerGroup] = None,
+    store: Optional[SessionStore] = None,
+    batch_messages=False,
+    inbound_limits: Optional[InboundLimits] = None,
+    executor: Optional[HandlerExecutor] = None,
+    metrics: Optional[Metrics] = None,
+    metrics_route: Optional[str] = None,
+    tracer: Optional[Tracer] = None,
+    store_interval=0.05,
+    maxsize=128 * 1024,
     debug=False,
 ) -> List[web.AbstractRoute]:
     registered_routes = []
 
     assert callable(handler), handler
-    if not asyncio.iscoroutinefunction(handler) and not inspect.isgeneratorfunction(
-        handler
+    if (
+        executor is None
+        and not asyncio.iscoroutinefunction(handler)
+        and not inspect.isgeneratorfunction(handler)
     ):
         sync_handler = handler
 
@@ -66,6 +92,9 @@ def add_endpoint(
     if not name:
         name = _gen_endpoint_name()
 
+    if metrics is None and metrics_route is not None:
+        metrics = Metrics()
+
     # set session manager
     if manager is None:
         manager = SessionManager(
@@ -75,6 +104,20 @@ def add_endpoint(
             heartbeat_delay,
             disconnect_delay,
             debug=debug,
+            queue_limits=queue_limits,
+            codec=codec,
+            batch_window=batch_window,
+            bus=bus,
+            store=store,
+            batch_messages=batch_messages,
+            inbound_limits=inbound_limits,
+            executor=executor,
+            metrics=metrics,
+            tracer=tracer,
+            store_interval=store_interval,
+            maxsize=maxsize,
+            heartbeat_resolution=heartbeat_resolution,
+            heartbeat_jitter=heartbeat_jitter,
         )
 
     if manager.name != name:
@@ -94,6 +137,7 @@ def add_endpoint(
         transport_handlers,
         disable_transports,
         cookie_needed,
+        workers,
     )
 
     prefix = prefix.rstrip("/")
@@ -155,7 +199,26 @@ def add_endpoint(
         )
     )
 
+    # metrics of all endpoints are served by one route
+    metrics_routes = app.setdefault("__sockjs_metrics_routes__", set())
+    if metrics_route is not None and metrics_route not in metrics_routes:
+        metrics_routes.add(metrics_route)
+        registered_routes.append(
+            router.add_route(hdrs.METH_GET, metrics_route, metrics_handler)
+        )
+
     app.on_cleanup.append(manager.stop)
+    if manager.bus is not None:
+        app.on_startup.append(manager.bus.start)
+        app.on_cleanup.append(manager.bus.close)
+    if workers is not None:
+        app.on_cleanup.append(workers.close)
+    if manager.executor is not None:
+        app.on_cleanup.append(manager.executor.close)
+    if manager.tracer is not None:
+        app.on_cleanup.append(manager.tracer.close)
+    if manager.store is not None:
+        app.on_cleanup.append(manager.store.close)
 
     if cors_config is not None:
         # Configure CORS on all routes.
@@ -174,12 +237,14 @@ class SockJSRoute:
         handlers,
         disable_transports: Iterable[str],
         cookie_needed=True,
+        workers: Optional[WorkerGroup] = None,
     ):
         self.name = name
         self.manager = manager
         self.handlers = handlers
         self.disable_transports = set(disable_transports)
         self.cookie_needed = cookie_needed
+        self.workers = workers
         self.iframe_html = (IFRAME_HTML % sockjs_cdn).encode("utf-8")
         self.iframe_html_hxd = hashlib.md5(self.iframe_html).hexdigest()
         transport_names = {
@@ -197,17 +262,23 @@ class SockJSRoute:
         if transport_class is None or transport_class.name in self.disable_transports:
             raise web.HTTPNotFound()
 
+        sid = info["session"]
+        if not sid or "." in sid or "." in info["server"]:
+            raise web.HTTPNotFound()
+
+        # requests of a session are handled by the worker holding it
+        if self.workers is not None:
+            owner = self.workers.forward_to(request, info["server"], sid, t_id)
+            if owner is not None:
+                return await self.workers.forward(request, owner)
+
         # session
         manager = self.manager
         if not manager.started:
             manager.start()
 
-        sid = info["session"]
-        if not sid or "." in sid or "." in info["server"]:
-            raise web.HTTPNotFound()
-
         try:
-            session = transport_class.get_session(manager, sid)
+            session = await transport_class.get_session(manager, sid)
         except KeyError:
             raise web.HTTPNotFound(headers=session_cookie(request))
 
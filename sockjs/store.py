@@ -0,0 +1,418 @@
+import abc
+import asyncio
+import logging
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple, TypeVar
+
+from .protocol import HEARTBEAT_FRAME, Frame, MsgType, SessionState
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import SessionManager
+
+
+log = logging.getLogger("sockjs")
+_T = TypeVar("_T")
+
+
+class SessionStore(abc.ABC):
+    """Registry of sessions shared by session managers of worker processes.
+
+    A ``Session`` object, its handler and its outgoing queue live in the
+    worker that created it, the owner. The store records the owner of every
+    session and the worker that has acquired it, and passes inbound messages
+    to the owner and outgoing frames from the owner. So a worker can serve
+    ``xhr`` and ``xhr_send`` requests of a session of another worker through
+    a ``RemoteSession``. ``worker`` is the number of this worker.
+
+    Sessions are identified by the name of their ``SessionManager`` and
+    their id. ``SessionManager`` calls methods of the store through
+    ``run()`` and ``run_soon()``, a store doing blocking I/O overrides them
+    to keep the calls off the event loop.
+    """
+
+    worker = 0
+
+    async def run(self, method: Callable[..., _T], *args) -> _T:
+        """Call a method of the store and return its result."""
+        return method(*args)
+
+    def run_soon(self, method: Callable, *args):
+        """Call a method of the store without waiting for it, calls are
+        performed in order."""
+        method(*args)
+
+    @abc.abstractmethod
+    def add(self, name: str, sid: str):
+        """Record session owned by this worker."""
+
+    @abc.abstractmethod
+    def remove(self, name: str, sid: str):
+        """Forget session and its frames."""
+
+    @abc.abstractmethod
+    def owner(self, name: str, sid: str) -> Optional[int]:
+        """Worker owning session, None if the session is unknown."""
+
+    @abc.abstractmethod
+    def acquire(self, name: str, sid: str) -> bool:
+        """Mark session acquired by this worker, False if it is acquired."""
+
+    @abc.abstractmethod
+    def release(self, name: str, sid: str):
+        """Unmark session acquired by this worker."""
+
+    @abc.abstractmethod
+    def remote_acquired(self, name: str) -> list[str]:
+        """Ids of sessions of this worker acquired by other workers."""
+
+    @abc.abstractmethod
+    def put_inbound(self, name: str, sid: str, owner: int, kind: MsgType, data: bytes):
+        """Pass an inbound message of a session to its owner."""
+
+    @abc.abstractmethod
+    def take_inbound(self, name: str) -> list[Tuple[str, MsgType, bytes]]:
+        """Remove and return inbound messages of sessions of this worker."""
+
+    @abc.abstractmethod
+    def put_frame(self, name: str, sid: str, frame: Frame, data: bytes):
+        """Pass an outgoing frame of a session to the worker serving it."""
+
+    @abc.abstractmethod
+    def has_frames(self, name: str, sid: str) -> bool:
+        """Whether outgoing frames of a session are waiting."""
+
+    @abc.abstractmethod
+    def take_frames(self, name: str, sid: str) -> list[Tuple[Frame, bytes]]:
+        """Remove and return outgoing frames of a session."""
+
+    @abc.abstractmethod
+    def clear(self, name: str):
+        """Remove sessions of this worker."""
+
+    async def close(self, _app=None):
+        """Release resources of the store, called on application cleanup."""
+
+
+class MemoryStore(SessionStore):
+    """Store of one process, shared with ``for_worker()``.
+
+    Managers of one process never see each other's sessions without a
+    store, so this is mostly useful to test code running in several
+    workers.
+    """
+
+    def __init__(self, worker: int = 0):
+        self.worker = worker
+        self._sessions: dict[Tuple[str, str], list] = {}
+        self._inbound: list[Tuple[str, int, str, MsgType, bytes]] = []
+        self._frames: dict[Tuple[str, str], list[Tuple[Frame, bytes]]] = {}
+
+    def for_worker(self, worker: int) -> "MemoryStore":
+        store = MemoryStore(worker)
+        store._sessions = self._sessions
+        store._inbound = self._inbound
+        store._frames = self._frames
+        return store
+
+    def add(self, name, sid):
+        self._sessions[name, sid] = [self.worker, None]
+
+    def remove(self, name, sid):
+        self._sessions.pop((name, sid), None)
+        self._frames.pop((name, sid), None)
+
+    def owner(self, name, sid):
+        record = self._sessions.get((name, sid))
+        return None if record is None else record[0]
+
+    def acquire(self, name, sid):
+        record = self._sessions.get((name, sid))
+        if record is None or record[1] is not None:
+            return False
+        record[1] = self.worker
+        return True
+
+    def release(self, name, sid):
+        record = self._sessions.get((name, sid))
+        if record is not None and record[1] == self.worker:
+            record[1] = None
+
+    def remote_acquired(self, name):
+        worker = self.worker
+        return [
+            sid
+            for (n, sid), (owner, acquired) in self._sessions.items()
+            if n == name and owner == worker and acquired not in (None, worker)
+        ]
+
+    def put_inbound(self, name, sid, owner, kind, data):
+        self._inbound.append((name, owner, sid, kind, data))
+
+    def take_inbound(self, name):
+        taken, kept = [], []
+        for item in self._inbound:
+            if item[0] == name and item[1] == self.worker:
+                taken.append(item[2:])
+            else:
+                kept.append(item)
+        self._inbound[:] = kept
+        return taken
+
+    def put_frame(self, name, sid, frame, data):
+        self._frames.setdefault((name, sid), []).append((frame, data))
+
+    def has_frames(self, name, sid):
+        return bool(self._frames.get((name, sid)))
+
+    def take_frames(self, name, sid):
+        return self._frames.pop((name, sid), [])
+
+    def clear(self, name):
+        for key, (owner, _) in list(self._sessions.items()):
+            if key[0] == name and owner == self.worker:
+                self.remove(*key)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT NOT NULL,
+    sid TEXT NOT NULL,
+    owner INTEGER NOT NULL,
+    acquired INTEGER,
+    PRIMARY KEY (name, sid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS inbound (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    owner INTEGER NOT NULL,
+    sid TEXT NOT NULL,
+    kind INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inbound_owner ON inbound (name, owner);
+CREATE TABLE IF NOT EXISTS frames (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    sid TEXT NOT NULL,
+    frame TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frames_sid ON frames (name, sid);
+"""
+
+
+class SQLiteStore(SessionStore):
+    """Store in a SQLite database in WAL mode shared by local workers.
+
+    Every statement is a short transaction of its own. ``run()`` and
+    ``run_soon()`` perform statements in a thread of the store, so waiting
+    up to ``timeout`` seconds for a lock held by another worker does not
+    block the event loop. Every thread uses a connection of its own.
+
+    Rows are taken from mailboxes with ``DELETE ... RETURNING`` if SQLite
+    is 3.35 or newer, otherwise with ``SELECT`` and ``DELETE`` in one
+    transaction.
+    """
+
+    #: Whether SQLite supports ``DELETE ... RETURNING``
+    returning = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+    def __init__(self, path: str, worker: int = 0, timeout: float = 5.0):
+        self.path = path
+        self.worker = worker
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="sockjs-store")
+        self._db.executescript(_SCHEMA)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Connection of the current thread."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._connections.append(db)
+        return db
+
+    async def run(self, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, method, *args)
+
+    def run_soon(self, method, *args):
+        self._executor.submit(method, *args).add_done_callback(_log_error)
+
+    def add(self, name, sid):
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, NULL)",
+            (name, sid, self.worker),
+        )
+
+    def remove(self, name, sid):
+        self._db.execute("DELETE FROM sessions WHERE name=? AND sid=?", (name, sid))
+        self._db.execute("DELETE FROM frames WHERE name=? AND sid=?", (name, sid))
+
+    def owner(self, name, sid):
+        row = self._db.execute(
+            "SELECT owner FROM sessions WHERE name=? AND sid=?", (name, sid)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def acquire(self, name, sid):
+        cursor = self._db.execute(
+            "UPDATE sessions SET acquired=? "
+            "WHERE name=? AND sid=? AND acquired IS NULL",
+            (self.worker, name, sid),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, name, sid):
+        self._db.execute(
+            "UPDATE sessions SET acquired=NULL "
+            "WHERE name=? AND sid=? AND acquired=?",
+            (name, sid, self.worker),
+        )
+
+    def remote_acquired(self, name):
+        rows = self._db.execute(
+            "SELECT sid FROM sessions WHERE name=? AND owner=? "
+            "AND acquired IS NOT NULL AND acquired!=owner",
+            (name, self.worker),
+        )
+        return [sid for sid, in rows]
+
+    def put_inbound(self, name, sid, owner, kind, data):
+        self._db.execute(
+            "INSERT INTO inbound (name, owner, sid, kind, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (name, owner, sid, kind.value, data),
+        )
+
+    def take_inbound(self, name):
+        rows = self._take(
+            "inbound", "sid, kind, data", "name=? AND owner=?", (name, self.worker)
+        )
+        return [(sid, MsgType(kind), data) for _, sid, kind, data in rows]
+
+    def _take(self, table: str, columns: str, where: str, params: tuple) -> list:
+        """Delete rows of a mailbox table and return them in order of ids."""
+        db = self._db
+        if self.returning:
+            rows = db.execute(
+                "DELETE FROM %s WHERE %s RETURNING id, %s" % (table, where, columns),
+                params,
+            ).fetchall()
+            rows.sort()
+            return rows
+
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                "SELECT id, %s FROM %s WHERE %s ORDER BY id" % (columns, table, where),
+                params,
+            ).fetchall()
+            db.execute("DELETE FROM %s WHERE %s" % (table, where), params)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return rows
+
+    def put_frame(self, name, sid, frame, data):
+        self._db.execute(
+            "INSERT INTO frames (name, sid, frame, data) VALUES (?, ?, ?, ?)",
+            (name, sid, frame.value, bytes(data)),
+        )
+
+    def has_frames(self, name, sid):
+        row = self._db.execute(
+            "SELECT 1 FROM frames WHERE name=? AND sid=? LIMIT 1", (name, sid)
+        ).fetchone()
+        return row is not None
+
+    def take_frames(self, name, sid):
+        rows = self._take("frames", "frame, data", "name=? AND sid=?", (name, sid))
+        return [(Frame(frame), data) for _, frame, data in rows]
+
+    def clear(self, name):
+        self._db.execute(
+            "DELETE FROM frames WHERE name=? AND sid IN "
+            "(SELECT sid FROM sessions WHERE name=? AND owner=?)",
+            (name, name, self.worker),
+        )
+        self._db.execute(
+            "DELETE FROM sessions WHERE name=? AND owner=?", (name, self.worker)
+        )
+        self._db.execute(
+            "DELETE FROM inbound WHERE name=? AND owner=?", (name, self.worker)
+        )
+
+    async def close(self, _app=None):
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+
+    def shutdown(self):
+        """Wait for pending calls and close connections."""
+        self._executor.shutdown()
+        connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+
+def _log_error(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        log.error("Exception in session store call.", exc_info=future.exception())
+
+
+class RemoteSession:
+    """Session owned by another worker, seen through a ``SessionStore``.
+
+    Frames are read from the store, inbound messages are passed to the owner
+    by ``SessionManager``. Heartbeats are generated locally.
+    """
+
+    remote = True
+    interrupted = False
+    tracer = None
+    state = SessionState.OPEN
+
+    def __init__(self, manager: "SessionManager", session_id: str, owner: int):
+        self.manager = manager
+        self.id = session_id
+        self.owner = owner
+
+    def __repr__(self):
+        return "<RemoteSession id=%s owner=%d>" % (self.id, self.owner)
+
+    def tick(self, timeout=None):
+        pass
+
+    async def get_frames(
+        self, pack=True, max_bytes: Optional[int] = None
+    ) -> list[Tuple[Frame, Any]]:
+        manager = self.manager
+        store = manager.store
+        waited = 0.0
+        while True:
+            frames = await store.run(store.take_frames, manager.name, self.id)
+            if frames:
+                return frames
+            if waited >= manager.heartbeat_delay:
+                return [(Frame.HEARTBEAT, HEARTBEAT_FRAME)]
+            await asyncio.sleep(manager.store_interval)
+            waited += manager.store_interval
+
+    async def get_merged_frame(self, max_bytes: Optional[int] = None):
+        # the owner hands over one merged frame at a time
+        return (await self.get_frames())[0]
@@ -0,0 +1,113 @@
+from typing import TYPE_CHECKING, Iterator, Optional
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import Session
+
+
+SEPARATOR = "."
+ANY_SEGMENT = "*"
+ANY_TAIL = "#"
+
+
+class _Node:
+    __slots__ = ("children", "sessions")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.sessions: set["Session"] = set()
+
+
+class TopicIndex:
+    """Subscriptions of sessions to topics.
+
+    Topics are strings of segments separated by dots, like
+    ``chat.room1.messages``. A subscription pattern may use ``*`` to match
+    exactly one segment and ``#`` as the last segment to match any number
+    of remaining segments, including none. Patterns are kept in a prefix
+    trie, so finding subscribers of a topic does not depend on the number
+    of sessions or topics.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._patterns: dict["Session", set[str]] = {}
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def subscribe(self, session: "Session", pattern: str) -> bool:
+        """Returns False if session has been subscribed to pattern already."""
+        segments = pattern.split(SEPARATOR)
+        if ANY_TAIL in segments[:-1]:
+            raise ValueError("'#' is allowed only as the last segment")
+
+        patterns = self._patterns.setdefault(session, set())
+        if pattern in patterns:
+            return False
+        patterns.add(pattern)
+
+        node = self._root
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _Node()
+            node = child
+        node.sessions.add(session)
+        return True
+
+    def unsubscribe(self, session: "Session", pattern: str) -> bool:
+        """Returns False if session has not been subscribed to pattern."""
+        patterns = self._patterns.get(session)
+        if patterns is None or pattern not in patterns:
+            return False
+        patterns.discard(pattern)
+        if not patterns:
+            del self._patterns[session]
+
+        path = [self._root]
+        segments = pattern.split(SEPARATOR)
+        for segment in segments:
+            path.append(path[-1].children[segment])
+        path[-1].sessions.discard(session)
+
+        # remove empty nodes
+        for idx in range(len(segments), 0, -1):
+            node = path[idx]
+            if node.sessions or node.children:
+                break
+            del path[idx - 1].children[segments[idx - 1]]
+        return True
+
+    def unsubscribe_all(self, session: "Session"):
+        for pattern in list(self._patterns.get(session, ())):
+            self.unsubscribe(session, pattern)
+
+    def patterns(self, session: "Session") -> frozenset[str]:
+        return frozenset(self._patterns.get(session, ()))
+
+    def subscribers(self, topic: str) -> set["Session"]:
+        """Sessions subscribed to patterns matching topic."""
+        result: set["Session"] = set()
+        for node in self._match(self._root, topic.split(SEPARATOR), 0):
+            result.update(node.sessions)
+        return result
+
+    def clear(self):
+        self._root = _Node()
+        self._patterns.clear()
+
+    def _match(self, node: _Node, segments: list[str], idx: int) -> Iterator[_Node]:
+        children = node.children
+        tail: Optional[_Node] = children.get(ANY_TAIL)
+        if tail is not None:
+            yield tail
+
+        if idx == len(segments):
+            yield node
+            return
+
+        for key in (segments[idx], ANY_SEGMENT):
+            child = children.get(key)
+            if child is not None:
+                yield from self._match(child, segments, idx + 1)
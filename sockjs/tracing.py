@@ -0,0 +1,250 @@
+import abc
+import dataclasses
+import json
+import math
+import time
+from collections import Counter, deque
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from .protocol import Frame, SessionState, SockjsMessage
+
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .session import Session
+
+
+class Tracer:
+    """Callbacks of a ``SessionManager`` at stages of frames and handlers.
+
+    Methods do nothing, subclasses override the stages they need. Callbacks
+    are called synchronously on the hot path and must not block. Without
+    a tracer the manager, sessions and transports only compare their
+    ``tracer`` attribute with None.
+    """
+
+    def on_message_received(self, session: "Session", transport: str, size: int):
+        """A payload of messages of a session is read by a transport."""
+
+    def on_frame_enqueued(self, session: "Session", frame: Frame, data):
+        """A frame is put to the outgoing queue of a session."""
+
+    def on_frame_dequeued(self, session: "Session", frame: Frame):
+        """A frame is taken from the outgoing queue of a session."""
+
+    def on_frame_written(self, session: "Session", transport: str, size: int):
+        """Frames of a session are written to a connection by a transport."""
+
+    def on_handler_start(self, session: "Session", msg: SockjsMessage):
+        """The handler is called with a message."""
+
+    def on_handler_end(self, session: "Session", msg: SockjsMessage):
+        """The handler has returned or raised."""
+
+    def on_session_state_change(
+        self, session: "Session", old: SessionState, new: SessionState
+    ):
+        """The state of a session is changed."""
+
+    async def close(self, _app=None):
+        """Release resources of the tracer, called on application cleanup."""
+
+
+class SamplingTracer(Tracer):
+    """Tracer recording latencies of every ``every``-th event of a stage.
+
+    Stages are ``handler``, the duration of a handler call, and ``queue``,
+    the time from the first frame queued for a session to the next write
+    of the session. The last ``max_samples`` latencies of a stage are kept
+    for ``percentiles()``. State changes are counted in ``transitions``.
+    """
+
+    STAGES = ("handler", "queue")
+
+    def __init__(
+        self,
+        every: int = 100,
+        max_samples: int = 10000,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.every = every
+        self.clock = clock
+        self.samples = {stage: deque(maxlen=max_samples) for stage in self.STAGES}
+        self.transitions: Counter[tuple[SessionState, SessionState]] = Counter()
+        self._counts = dict.fromkeys(self.STAGES, 0)
+        self._handlers: dict[tuple["Session", int], float] = {}
+        self._enqueued: dict["Session", float] = {}
+
+    def _sampled(self, stage: str) -> bool:
+        count = self._counts[stage] = self._counts[stage] + 1
+        return count % self.every == 0
+
+    def on_frame_enqueued(self, session, frame, data):
+        if session not in self._enqueued and self._sampled("queue"):
+            self._enqueued[session] = self.clock()
+
+    def on_frame_written(self, session, transport, size):
+        started = self._enqueued.pop(session, None)
+        if started is not None:
+            self.samples["queue"].append(self.clock() - started)
+
+    def on_handler_start(self, session, msg):
+        if self._sampled("handler"):
+            self._handlers[session, id(msg)] = self.clock()
+
+    def on_handler_end(self, session, msg):
+        started = self._handlers.pop((session, id(msg)), None)
+        if started is not None:
+            self.samples["handler"].append(self.clock() - started)
+
+    def on_session_state_change(self, session, old, new):
+        self.transitions[old, new] += 1
+        if new == SessionState.CLOSED:
+            self._enqueued.pop(session, None)
+
+    def percentiles(
+        self, stage: str, percents: Iterable[float] = (50, 90, 99)
+    ) -> dict[float, float]:
+        """Nearest-rank percentiles of recorded latencies of a stage."""
+        samples = sorted(self.samples[stage])
+        if not samples:
+            return {}
+        size = len(samples)
+        return {
+            percent: samples[max(0, math.ceil(percent / 100 * size) - 1)]
+            for percent in percents
+        }
+
+    def clear(self):
+        for samples in self.samples.values():
+            samples.clear()
+        self.transitions.clear()
+        self._handlers.clear()
+        self._enqueued.clear()
+
+
+@dataclasses.dataclass
+class Span:
+    """Timestamps of a message from its receipt to the write of its reply.
+
+    ``transport`` has read the message, ``write_transport`` has written the
+    first frame queued by the handler. Stages which have not happened, like
+    the write when the handler has not sent anything, are None.
+    """
+
+    session: str
+    transport: str
+    received: float
+    handler_start: Optional[float] = None
+    handler_end: Optional[float] = None
+    enqueued: Optional[float] = None
+    dequeued: Optional[float] = None
+    written: Optional[float] = None
+    write_transport: Optional[str] = None
+
+
+class SpanSink(abc.ABC):
+    """Destination of spans completed by ``LatencyTracer``."""
+
+    @abc.abstractmethod
+    def emit(self, span: Span):
+        pass
+
+    def close(self):
+        pass
+
+
+class JSONLSink(SpanSink):
+    """Appends spans to a file as JSON objects, one per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, span: Span):
+        self._file.write(json.dumps(dataclasses.asdict(span)) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class LatencyTracer(Tracer):
+    """Tracer of end-to-end latency of every ``every``-th received payload.
+
+    A sampled span follows a payload read by a transport through the first
+    handler call started after it, the first frame queued by that handler,
+    its dequeue and the write to a connection. A session has at most one
+    span in flight, payloads received meanwhile are not sampled. Spans are
+    passed to ``sink`` when the handler has returned and its frame has been
+    written, or when the session is closed.
+    """
+
+    def __init__(
+        self,
+        sink: SpanSink,
+        every: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.sink = sink
+        self.every = every
+        self.clock = clock
+        self._count = 0
+        self._spans: dict["Session", Span] = {}
+
+    def on_message_received(self, session, transport, size):
+        self._count += 1
+        if self._count % self.every == 0 and session not in self._spans:
+            self._spans[session] = Span(session.id, transport, self.clock())
+
+    def on_handler_start(self, session, msg):
+        span = self._spans.get(session)
+        if span is not None and span.handler_start is None:
+            span.handler_start = self.clock()
+
+    def on_frame_enqueued(self, session, frame, data):
+        span = self._spans.get(session)
+        if (
+            span is not None
+            and span.handler_start is not None
+            and span.handler_end is None
+            and span.enqueued is None
+        ):
+            span.enqueued = self.clock()
+
+    def on_handler_end(self, session, msg):
+        span = self._spans.get(session)
+        if (
+            span is not None
+            and span.handler_start is not None
+            and span.handler_end is None
+        ):
+            span.handler_end = self.clock()
+            self._complete(session, span)
+
+    def on_frame_dequeued(self, session, frame):
+        span = self._spans.get(session)
+        if span is not None and span.enqueued is not None and span.dequeued is None:
+            span.dequeued = self.clock()
+
+    def on_frame_written(self, session, transport, size):
+        span = self._spans.get(session)
+        if span is not None and span.dequeued is not None and span.written is None:
+            span.written = self.clock()
+            span.write_transport = transport
+            self._complete(session, span)
+
+    def on_session_state_change(self, session, old, new):
+        if new == SessionState.CLOSED and session in self._spans:
+            self.sink.emit(self._spans.pop(session))
+
+    def _complete(self, session: "Session", span: Span):
+        if span.handler_end is not None and (
+            span.enqueued is None or span.written is not None
+        ):
+            del self._spans[session]
+            self.sink.emit(span)
+
+    async def close(self, _app=None):
+        spans, self._spans = self._spans, {}
+        for span in spans.values():
+            self.sink.emit(span)
+        self.sink.close()
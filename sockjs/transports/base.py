@@ -1,5 +1,6 @@
 import abc
 import asyncio
+from typing import Union
 
 from aiohttp import web
 from aiohttp.web_exceptions import HTTPClientError, HTTPError
@@ -8,6 +9,7 @@ from ..exceptions import SessionIsAcquired, SessionIsClosed
 from ..protocol import (
     ENCODING,
     close_frame,
+    FrameBlob,
     SessionState,
     Frame,
 )
@@ -23,8 +25,11 @@ class Transport(abc.ABC):
     create_session = True
 
     @classmethod
-    def get_session(cls, manager: SessionManager, session_id: str) -> Session:
-        return manager.get(session_id, create=cls.create_session)
+    async def get_session(cls, manager: SessionManager, session_id: str) -> Session:
+        session = await manager.get_remote(session_id)
+        if session is None:
+            session = manager.get(session_id, create=cls.create_session)
+        return session
 
     def __init__(
         self,
@@ -40,25 +45,72 @@ class Transport(abc.ABC):
     async def process(self) -> web.StreamResponse:
         pass
 
+    def _received(self, data: Union[bytes, str]):
+        """Report a payload of messages read from the client, the size of
+        a decoded websocket payload is counted in bytes of UTF-8."""
+        metrics = self.manager.metrics
+        tracer = self.session.tracer
+        if metrics is None and tracer is None:
+            return
+        if isinstance(data, str) and not data.isascii():
+            size = len(data.encode(ENCODING))
+        else:
+            size = len(data)
+        if metrics is not None:
+            metrics.received(self.name, size)
+        if tracer is not None:
+            tracer.on_message_received(self.session, self.name, size)
+
+    def _written(self, size: int, frames: int = 1):
+        """Report frames written to the client."""
+        if self.manager.metrics is not None:
+            self.manager.metrics.sent(self.name, size, frames)
+        if self.session.tracer is not None:
+            self.session.tracer.on_frame_written(self.session, self.name, size)
+
 
 class StreamingTransport(Transport, abc.ABC):
     timeout = None
-    maxsize = 128 * 1024
+    # polling transports send one frame per response, messages ready in
+    # the session queue are merged into a frame of up to maxsize bytes
+    polling = False
 
     def __init__(self, manager: SessionManager, session: Session, request: web.Request):
         super().__init__(manager, session, request)
+        self.maxsize = manager.maxsize
         self.size = 0
         self.response = None
 
-    async def _send(self, text: str):
+    def _encode(self, frame: bytes) -> bytes:
+        """Frame as it is written to the response."""
+        return frame
+
+    def _wire(self, frame: bytes) -> bytes:
+        if isinstance(frame, FrameBlob):
+            return frame.wire(type(self), self._encode)
+        return self._encode(frame)
+
+    async def _send(self, frame: bytes):
+        return await self._write(self._wire(frame))
+
+    async def _send_frames(self, frames: list[bytes]):
+        """Write frames with one write, returns True if maxsize is reached."""
+        if len(frames) == 1:
+            return await self._send(frames[0])
+        return await self._write(b"".join(map(self._wire, frames)), len(frames))
+
+    async def _write(self, data: bytes, frames: int = 1):
         try:
-            blob = text.encode(ENCODING)
-            await self.response.write(blob)
-            self.size += len(blob)
+            await self.response.write(data)
+            self.size += len(data)
+            self._written(len(data), frames)
             return self.size > self.maxsize
         except ConnectionResetError as e:
             raise HTTPClientClosedConnection() from e
 
+    async def _get_merged_frame(self):
+        return [await self.session.get_merged_frame(self.maxsize)]
+
     async def handle_session(self):
         assert self.response is not None, "Response is not specified."
 
@@ -82,24 +134,26 @@ class StreamingTransport(Transport, abc.ABC):
 
         try:
             while True:
+                if self.polling:
+                    get_frames = self._get_merged_frame()
+                else:
+                    get_frames = self.session.get_frames(
+                        max_bytes=self.maxsize - self.size
+                    )
                 if self.timeout:
                     try:
-                        frame, text = await asyncio.wait_for(
-                            self.session.get_frame(),
-                            timeout=self.timeout,
-                        )
+                        frames = await asyncio.wait_for(get_frames, self.timeout)
                     except asyncio.futures.TimeoutError:
-                        frame, text = Frame.MESSAGE, "a[]"
+                        frames = [(Frame.MESSAGE, b"a[]")]
                 else:
-                    frame, text = await self.session.get_frame()
+                    frames = await get_frames
 
-                if frame == Frame.CLOSE:
+                closing = frames[-1][0] == Frame.CLOSE
+                if closing:
                     await self.manager.remote_closed(self.session)
-                    await self._send(text)
-                    break
 
-                stop = await self._send(text)
-                if stop:
+                stop = await self._send_frames([data for _, data in frames])
+                if stop or closing or self.polling:
                     break
         except (asyncio.CancelledError, ConnectionError, HTTPError) as e:
             await self.manager.remote_close(self.session, exc=e)
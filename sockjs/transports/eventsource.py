@@ -11,9 +11,8 @@ class EventsourceTransport(StreamingTransport):
     name = "eventsource"
     create_session = True
 
-    async def _send(self, text: str):
-        text = "".join(("data: ", text, "\r\n\r\n"))
-        return await super()._send(text)
+    def _encode(self, frame: bytes) -> bytes:
+        return b"".join((b"data: ", frame, b"\r\n\r\n"))
 
     async def process(self):
         headers = (
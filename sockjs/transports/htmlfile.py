@@ -7,7 +7,7 @@ from multidict import MultiDict
 
 from .base import StreamingTransport
 from .utils import CACHE_CONTROL, session_cookie
-from ..protocol import dumps
+from ..protocol import quote_frame
 
 
 PRELUDE1 = b"""
@@ -32,9 +32,8 @@ class HTMLFileTransport(StreamingTransport):
     create_session = True
     check_callback = re.compile(r"^[a-zA-Z0-9_\.]+$")
 
-    async def _send(self, text: str):
-        text = "<script>\np(%s);\n</script>\r\n" % dumps(text)
-        return await super()._send(text)
+    def _encode(self, frame: bytes) -> bytes:
+        return b"".join((b"<script>\np(", quote_frame(frame), b");\n</script>\r\n"))
 
     async def process(self):
         request = self.request
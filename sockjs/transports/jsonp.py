@@ -1,26 +1,33 @@
 """jsonp transport"""
 
 import re
-from urllib.parse import unquote_plus
+from urllib.parse import unquote_to_bytes
 
 from aiohttp import hdrs, web
 from multidict import MultiDict
 
 from .base import StreamingTransport
 from .utils import CACHE_CONTROL, session_cookie
-from ..protocol import ENCODING, dumps, loads
+from ..protocol import ENCODING, FrameBlob, quote_frame
 
 
 class JSONPolling(StreamingTransport):
     name = "jsonp-polling"
     create_session = True
-    maxsize = 0
+    polling = True
     check_callback = re.compile(r"^[a-zA-Z0-9_\.]+$")
     callback = ""
 
-    async def _send(self, text: str):
-        text = "/**/%s(%s);\r\n" % (self.callback, dumps(text))
-        return await super()._send(text)
+    def _encode(self, frame: bytes) -> bytes:
+        if isinstance(frame, FrameBlob):
+            # callback is unique for every request, share only escaped frame
+            payload = frame.wire(quote_frame, quote_frame)
+        else:
+            payload = quote_frame(frame)
+        callback = self.callback.encode(ENCODING)
+        return b"".join((b"/**/", callback, b"(", payload, b");\r\n"))
+
+    _wire = _encode
 
     async def process(self):
         manager = self.manager
@@ -58,15 +65,14 @@ class JSONPolling(StreamingTransport):
                 if not data.startswith(b"d="):
                     raise web.HTTPInternalServerError(text="Payload expected.")
 
-                data = unquote_plus(data[2:].decode(ENCODING))
-            else:
-                data = data.decode(ENCODING)
+                data = unquote_to_bytes(data[2:].replace(b"+", b" "))
 
             if not data:
                 raise web.HTTPInternalServerError(text="Payload expected.")
+            self._received(data)
 
             try:
-                messages = loads(data)
+                messages = manager.codec.loads(data)
             except Exception:
                 raise web.HTTPInternalServerError(text="Broken JSON encoding.")
 
@@ -2,16 +2,14 @@
 
 import asyncio
 from asyncio import ensure_future
-from typing import Optional
 from uuid import uuid4
 
 from aiohttp import web
-from async_timeout import timeout
 
 from .base import Transport
-from .utils import cancel_tasks
+from .utils import cancel_tasks, send_text
 from ..exceptions import SessionIsClosed
-from ..protocol import Frame
+from ..protocol import Frame, FrameBlob
 from ..session import Session, SessionManager
 
 
@@ -20,7 +18,7 @@ class RawWebSocketTransport(Transport):
     heartbeat_timeout = 10
 
     @classmethod
-    def get_session(cls, manager: SessionManager, session_id: str) -> Session:
+    async def get_session(cls, manager: SessionManager, session_id: str) -> Session:
         # For WebSockets, as opposed to other transports, it is valid to
         # reuse `session_id`. The lifetime of SockJS WebSocket session is
         # defined by a lifetime of underlying WebSocket connection. It is
@@ -29,14 +27,12 @@ class RawWebSocketTransport(Transport):
 
         # Generate unique session_id based on given ID.
         orig_session_id = session_id
-        while session_id in manager.sessions:
+        while (
+            manager.get(session_id, default=None) is not None
+            or await manager.get_remote(session_id) is not None
+        ):
             session_id = "%s-%s" % (orig_session_id, uuid4().hex[-8:])
-        return super().get_session(manager, session_id)
-
-    def __init__(self, manager: SessionManager, session: Session, request: web.Request):
-        super().__init__(manager, session, request)
-        self._pong_event = asyncio.Event()
-        self._wait_pong_task: Optional[asyncio.Task] = None
+        return await super().get_session(manager, session_id)
 
     async def server(self, ws: web.WebSocketResponse):
         while True:
@@ -48,43 +44,41 @@ class RawWebSocketTransport(Transport):
             if frame == Frame.MESSAGE:
                 for text in data:
                     await ws.send_str(text)
+                    self._written(len(text))
             elif frame == Frame.MESSAGE_BLOB:
-                data = data[1:]
-                if data.startswith("["):
-                    data = data[1:-1]
-                await ws.send_str(data)
+                if isinstance(data, FrameBlob):
+                    data = data.wire(RawWebSocketTransport, self._unpack_blob)
+                else:
+                    data = self._unpack_blob(data)
+                await send_text(ws, data)
+                self._written(len(data))
             elif frame == Frame.HEARTBEAT:
                 await ws.ping()
-                if self._wait_pong_task is None:
-                    self._wait_pong_task = asyncio.create_task(self._wait_pong())
-                    self._wait_pong_task.add_done_callback(self._wait_done_callback)
+                self.manager.heartbeat_scheduler.wait_pong(
+                    self.session, self.heartbeat_timeout
+                )
             elif frame == Frame.CLOSE:
                 try:
                     await ws.close(message=b"Go away!")
                 finally:
                     await self.manager.remote_closed(self.session)
 
-    async def _wait_pong(self):
-        try:
-            async with timeout(self.heartbeat_timeout):
-                await self._pong_event.wait()
-        except asyncio.TimeoutError:
-            self.session.close(3000, "No response from heartbeat")
-        finally:
-            self._pong_event.clear()
-
-    def _wait_done_callback(self, _):
-        self._wait_pong_task = None
+    @staticmethod
+    def _unpack_blob(data: bytes) -> bytes:
+        data = data[1:]
+        if data.startswith(b"["):
+            data = data[1:-1]
+        return data
 
     async def client(self, ws: web.WebSocketResponse):
         while True:
             msg = await ws.receive()
-            if self._wait_pong_task is not None:
-                self._pong_event.set()
+            self.manager.heartbeat_scheduler.pong(self.session)
 
             if msg.type == web.WSMsgType.text:
                 if not msg.data:
                     continue
+                self._received(msg.data)
                 await self.manager.remote_message(self.session, msg.data)
             elif msg.type == web.WSMsgType.close:
                 await self.manager.remote_close(self.session)
@@ -122,6 +116,6 @@ class RawWebSocketTransport(Transport):
         finally:
             self.session.expire()
             await self.manager.release(self.session)
-            await cancel_tasks(server, client, self._wait_pong_task)
+            await cancel_tasks(server, client)
 
         return ws
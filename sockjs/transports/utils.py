@@ -3,7 +3,7 @@ import http.cookies
 from datetime import datetime, timedelta
 
 import async_timeout
-from aiohttp import hdrs
+from aiohttp import WSMsgType, hdrs, web
 
 
 CACHE_CONTROL = "no-store, no-cache, no-transform, must-revalidate, max-age=0"
@@ -32,6 +32,11 @@ def cache_headers():
     )
 
 
+async def send_text(ws: web.WebSocketResponse, data: bytes):
+    """Send already encoded text message to websocket."""
+    await ws.send_frame(data, WSMsgType.TEXT)
+
+
 async def cancel_tasks(*coros_or_futures, timeout=1):
     """Cancel all not stopped coroutine or feature before exit
     from this context manager.
@@ -3,17 +3,15 @@
 import asyncio
 import logging
 from asyncio import ensure_future
-from typing import Optional
 from uuid import uuid4
 
 from aiohttp import web
 from aiohttp.web_exceptions import HTTPMethodNotAllowed
-from async_timeout import timeout
 
 from .base import Transport
-from .utils import cancel_tasks
+from .utils import cancel_tasks, send_text
 from ..exceptions import SessionIsClosed
-from ..protocol import SessionState, Frame, close_frame, loads
+from ..protocol import SessionState, Frame, close_frame
 from ..session import Session, SessionManager
 
 
@@ -25,7 +23,7 @@ class WebSocketTransport(Transport):
     heartbeat_timeout = 10
 
     @classmethod
-    def get_session(cls, manager: SessionManager, session_id: str) -> Session:
+    async def get_session(cls, manager: SessionManager, session_id: str) -> Session:
         # For WebSockets, as opposed to other transports, it is valid to
         # reuse `session_id`. The lifetime of SockJS WebSocket session is
         # defined by a lifetime of underlying WebSocket connection. It is
@@ -34,14 +32,12 @@ class WebSocketTransport(Transport):
 
         # Generate unique session_id based on given ID.
         orig_session_id = session_id
-        while session_id in manager.sessions:
+        while (
+            manager.get(session_id, default=None) is not None
+            or await manager.get_remote(session_id) is not None
+        ):
             session_id = "%s-%s" % (orig_session_id, uuid4().hex[-8:])
-        return super().get_session(manager, session_id)
-
-    def __init__(self, manager: SessionManager, session: Session, request: web.Request):
-        super().__init__(manager, session, request)
-        self._pong_event = asyncio.Event()
-        self._wait_pong_task: Optional[asyncio.Task] = None
+        return await super().get_session(manager, session_id)
 
     async def server(self, ws: web.WebSocketResponse):
         while True:
@@ -53,12 +49,13 @@ class WebSocketTransport(Transport):
             if frame == Frame.HEARTBEAT:
                 await ws.ping()
                 log.debug("Send WS PING")
-                if self._wait_pong_task is None:
-                    self._wait_pong_task = asyncio.create_task(self._wait_pong())
-                    self._wait_pong_task.add_done_callback(self._wait_done_callback)
+                self.manager.heartbeat_scheduler.wait_pong(
+                    self.session, self.heartbeat_timeout
+                )
                 continue
 
-            await ws.send_str(data)
+            await send_text(ws, data)
+            self._written(len(data))
 
             if frame == Frame.CLOSE:
                 try:
@@ -66,31 +63,19 @@ class WebSocketTransport(Transport):
                 finally:
                     await self.manager.remote_closed(self.session)
 
-    async def _wait_pong(self):
-        try:
-            async with timeout(self.heartbeat_timeout):
-                await self._pong_event.wait()
-        except asyncio.TimeoutError:
-            self.session.close(3000, "No response from heartbeat")
-        finally:
-            self._pong_event.clear()
-
-    def _wait_done_callback(self, _):
-        self._wait_pong_task = None
-
     async def client(self, ws: web.WebSocketResponse):
         while True:
             msg = await ws.receive()
-            if self._wait_pong_task is not None:
-                self._pong_event.set()
+            self.manager.heartbeat_scheduler.pong(self.session)
 
             if msg.type == web.WSMsgType.text:
                 data = msg.data
                 if not data:
                     continue
+                self._received(data)
 
                 try:
-                    text = loads(data)
+                    text = self.manager.codec.loads(data)
                 except Exception as exc:
                     await self.manager.remote_close(self.session, exc)
                     await self.manager.remote_closed(self.session)
@@ -130,14 +115,14 @@ class WebSocketTransport(Transport):
 
         # session was interrupted
         if self.session.interrupted:
-            await ws.send_str(close_frame(1002, "Connection interrupted"))
+            await send_text(ws, close_frame(1002, "Connection interrupted"))
         elif self.session.state == SessionState.CLOSED:
-            await ws.send_str(close_frame(3000, "Go away!"))
+            await send_text(ws, close_frame(3000, "Go away!"))
         else:
             try:
                 await self.manager.acquire(self.session, self.request)
             except Exception:  # should use specific exception
-                await ws.send_str(close_frame(3000, "Go away!"))
+                await send_text(ws, close_frame(3000, "Go away!"))
                 await ws.close()
                 return ws
             server = ensure_future(self.server(ws))
@@ -153,6 +138,6 @@ class WebSocketTransport(Transport):
             finally:
                 self.session.expire()
                 await self.manager.release(self.session)
-                await cancel_tasks(server, client, self._wait_pong_task)
+                await cancel_tasks(server, client)
 
         return ws
@@ -3,7 +3,6 @@ from multidict import MultiDict
 
 from .base import StreamingTransport, Transport
 from .utils import CACHE_CONTROL, cache_headers, session_cookie
-from ..protocol import loads, ENCODING
 
 
 class XHRTransport(StreamingTransport):
@@ -12,10 +11,10 @@ class XHRTransport(StreamingTransport):
 
     name = "xhr-polling"
     create_session = True
-    maxsize = 0
+    polling = True
 
-    async def _send(self, text: str):
-        return await super()._send(text + "\n")
+    def _encode(self, frame: bytes) -> bytes:
+        return frame + b"\n"
 
     async def process(self):
         request = self.request
@@ -64,9 +63,10 @@ class XHRSendTransport(Transport):
         data = await request.read()
         if not data:
             raise web.HTTPInternalServerError(text="Payload expected.")
+        self._received(data)
 
         try:
-            messages = loads(data.decode(ENCODING))
+            messages = self.manager.codec.loads(data)
         except Exception:
             raise web.HTTPInternalServerError(text="Broken JSON encoding.")
 
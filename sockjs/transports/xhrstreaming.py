@@ -10,8 +10,8 @@ class XHRStreamingTransport(StreamingTransport):
     create_session = True
     open_seq = b"h" * 2048 + b"\n"
 
-    async def _send(self, text: str):
-        return await super()._send(text + "\n")
+    def _encode(self, frame: bytes) -> bytes:
+        return frame + b"\n"
 
     async def process(self):
         request = self.request
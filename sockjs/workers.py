@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import zlib
+from typing import Callable, Optional
+
+import aiohttp
+from aiohttp import hdrs, web
+from multidict import CIMultiDict
+from yarl import URL
+
+from .bus import UnixSocketBroker
+
+
+log = logging.getLogger("sockjs")
+
+FORWARDED_HEADER = "X-SockJS-Forwarded"
+
+# headers of one connection that are not forwarded, bodies are
+# re-framed by the forwarding worker
+_HOP_BY_HOP = frozenset(
+    name.lower()
+    for name in (
+        hdrs.CONNECTION,
+        hdrs.CONTENT_LENGTH,
+        hdrs.KEEP_ALIVE,
+        hdrs.PROXY_AUTHENTICATE,
+        hdrs.PROXY_AUTHORIZATION,
+        hdrs.TE,
+        hdrs.TRAILER,
+        hdrs.TRANSFER_ENCODING,
+        hdrs.UPGRADE,
+    )
+)
+
+# websocket sessions live in the worker that accepted the connection
+_LOCAL_TRANSPORTS = frozenset(("websocket",))
+
+
+def _copy_headers(headers) -> CIMultiDict:
+    return CIMultiDict(
+        (name, value)
+        for name, value in headers.items()
+        if name.lower() not in _HOP_BY_HOP
+    )
+
+
+class WorkerGroup:
+    """Worker processes serving one port with ``SO_REUSEPORT``.
+
+    The kernel spreads connections among workers, but all requests of
+    a session, e.g. ``xhr`` and ``xhr_send`` of a polling session, must reach
+    the worker that holds the ``Session``. The owner of a session is chosen
+    by the ``{server}`` segment of the URL, which a client keeps for all
+    requests of a session, or by a hash of the session id if the segment is
+    not a number. Other workers forward requests to the owner over its unix
+    socket, requests arriving on that socket are never forwarded again.
+    ``index`` is the number of this worker.
+    """
+
+    def __init__(self, workers: int, socket_dir: str, index: int = 0):
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        self.workers = workers
+        self.socket_dir = socket_dir
+        self.index = index
+        self.forwarded = 0
+        self._clients: dict[int, aiohttp.ClientSession] = {}
+
+    def socket_path(self, index: int) -> str:
+        return os.path.join(self.socket_dir, "worker-%d.sock" % index)
+
+    @property
+    def bus_path(self) -> str:
+        """Path of the ``UnixSocketBroker`` started by ``run_workers()``."""
+        return os.path.join(self.socket_dir, "bus.sock")
+
+    def owner(self, server: str, session: str) -> int:
+        if server.isdigit():
+            return int(server) % self.workers
+        return zlib.crc32(session.encode()) % self.workers
+
+    def forward_to(
+        self, request: web.Request, server: str, session: str, transport: str
+    ) -> Optional[int]:
+        """Index of the worker the request must be forwarded to, or None
+        if this worker handles it."""
+        if (
+            self.workers == 1
+            or transport in _LOCAL_TRANSPORTS
+            or self.is_forwarded(request)
+        ):
+            return None
+        owner = self.owner(server, session)
+        return None if owner == self.index else owner
+
+    def is_forwarded(self, request: web.Request) -> bool:
+        """Whether the request has been forwarded by another worker, i.e. it
+        has arrived on the unix socket of this worker. ``FORWARDED_HEADER``
+        is set by clients as well, so it is not trusted."""
+        transport = request.transport
+        if transport is None:
+            return False
+        return transport.get_extra_info("sockname") == self.socket_path(self.index)
+
+    def _client(self, index: int) -> aiohttp.ClientSession:
+        client = self._clients.get(index)
+        if client is None:
+            client = self._clients[index] = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(self.socket_path(index)),
+                timeout=aiohttp.ClientTimeout(total=None),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                auto_decompress=False,
+            )
+        return client
+
+    async def forward(self, request: web.Request, index: int) -> web.StreamResponse:
+        """Proxy the request to worker ``index``, streaming the response."""
+        headers = _copy_headers(request.headers)
+        headers[FORWARDED_HEADER] = str(self.index)
+        body = await request.read() if request.body_exists else None
+        url = URL.build(
+            scheme="http",
+            host="localhost",
+            path=request.rel_url.raw_path,
+            query_string=request.rel_url.raw_query_string,
+            encoded=True,
+        )
+        self.forwarded += 1
+        try:
+            async with self._client(index).request(
+                request.method, url, headers=headers, data=body, allow_redirects=False
+            ) as upstream:
+                response = web.StreamResponse(
+                    status=upstream.status,
+                    reason=upstream.reason,
+                    headers=_copy_headers(upstream.headers),
+                )
+                await response.prepare(request)
+                async for chunk in upstream.content.iter_any():
+                    await response.write(chunk)
+                await response.write_eof()
+                return response
+        except aiohttp.ClientConnectionError as exc:
+            log.warning("Can not forward request to worker %d: %s", index, exc)
+            raise web.HTTPBadGateway()
+
+    async def close(self, _app=None):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.close()
+
+
+def _run_worker(app_factory, group: WorkerGroup, host, port, kwargs):
+    app = app_factory(group)
+    app.on_cleanup.append(group.close)
+    web.run_app(
+        app,
+        host=host,
+        port=port,
+        path=group.socket_path(group.index),
+        reuse_port=True,
+        **kwargs,
+    )
+
+
+async def _supervise(processes, broker: Optional[UnixSocketBroker]):
+    if broker is not None:
+        await broker.start()
+    for process in processes:
+        process.start()
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, task.cancel)
+    except NotImplementedError:  # pragma: no cover
+        pass
+    try:
+        await asyncio.gather(
+            *(loop.run_in_executor(None, process.join) for process in processes)
+        )
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            await loop.run_in_executor(None, process.join)
+        if broker is not None:
+            await broker.close()
+
+
+def run_workers(
+    app_factory: Callable[[WorkerGroup], web.Application],
+    *,
+    workers: Optional[int] = None,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    socket_dir: Optional[str] = None,
+    broker: bool = True,
+    **kwargs,
+):
+    """Run an application in ``workers`` processes sharing ``host:port``.
+
+    ``app_factory(group)`` is called in every worker and has to pass
+    ``group`` into ``add_endpoint(workers=group)``. Worker processes are
+    spawned, so ``app_factory`` must be a module level function. Every
+    worker also listens on a unix socket in ``socket_dir`` for forwarded
+    requests. If ``broker`` is true a ``UnixSocketBroker`` is started on
+    ``group.bus_path`` for ``UnixSocketBus`` of the workers. Other keyword
+    arguments are passed into ``aiohttp.web.run_app()``.
+    """
+    workers = workers or os.cpu_count() or 1
+    if socket_dir is None:
+        socket_dir = tempfile.mkdtemp(prefix="sockjs-")
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_run_worker,
+            args=(
+                app_factory,
+                WorkerGroup(workers, socket_dir, index),
+                host,
+                port,
+                kwargs,
+            ),
+            name="sockjs-worker-%d" % index,
+        )
+        for index in range(workers)
+    ]
+    bus_broker = None
+    if broker:
+        bus_broker = UnixSocketBroker(WorkerGroup(workers, socket_dir).bus_path)
+    try:
+        asyncio.run(_supervise(processes, bus_broker))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -1,4 +1,5 @@
 import asyncio
+import time
 from typing import Optional
 from unittest import mock
 
@@ -10,7 +11,7 @@ from aiohttp.web_urldispatcher import UrlMappingMatchInfo
 from multidict import CIMultiDict
 from yarl import URL
 
-from sockjs import Session, SessionManager, add_endpoint, transports
+from sockjs import Session, SessionManager, SessionState, add_endpoint, transports
 from sockjs.route import SockJSRoute
 
 
@@ -92,12 +93,33 @@ def make_request(app):
     return maker
 
 
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
 @pytest.fixture
 def make_session(make_handler, make_request):
     def maker(
-        name="test", disconnect_delay=10, manager: Optional[SessionManager] = None
+        name="test",
+        disconnect_delay=10,
+        manager: Optional[SessionManager] = None,
+        clock=time.monotonic,
+        state: SessionState = SessionState.NEW,
+        **kwargs,
     ):
-        session = Session(name, disconnect_delay=disconnect_delay, debug=True)
+        session = Session(
+            name, disconnect_delay=disconnect_delay, debug=True, clock=clock, **kwargs
+        )
+        session.state = state
         if manager:
             manager.sessions[session.id] = session
         return session
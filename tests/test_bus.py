@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from sockjs import (
+    LocalBroker,
+    LocalBus,
+    SessionManager,
+    SessionState,
+    UnixSocketBroker,
+    UnixSocketBus,
+)
+from sockjs.bus import Bus, BusMessage, BusMessageType, decode_record, encode_batch
+
+
+@pytest.fixture
+async def make_node(app, make_handler):
+    managers = []
+
+    def maker(bus, name="sm"):
+        manager = SessionManager(name, app, make_handler([]), debug=True, bus=bus)
+        managers.append(manager)
+        return manager
+
+    yield maker
+
+    for manager in managers:
+        await manager.stop()
+
+
+def add_session(manager, sid):
+    session = manager.get(sid, True)
+    session.state = SessionState.OPEN
+    return session
+
+
+def messages(session):
+    frames = [data for _, data in session._queue]
+    session._queue.clear()
+    return frames
+
+
+async def test_local_bus_broadcast(make_node):
+    broker = LocalBroker()
+    bus1, bus2 = LocalBus(broker), LocalBus(broker)
+    sm1 = make_node(bus1)
+    sm2 = make_node(bus2)
+    s1 = add_session(sm1, "s1")
+    s2 = add_session(sm2, "s2")
+    s3 = add_session(sm2, "s3")
+
+    sm1.broadcast("msg1")
+    sm1.broadcast("msg2", exclude_session_ids={"s3"})
+    assert messages(s1) == [b'a["msg1"]', b'a["msg2"]']
+    assert not s2._queue
+
+    await asyncio.sleep(0)
+    assert bus1.sent == 2
+    assert bus2.received == 2
+    assert messages(s2) == [b'a["msg1"]', b'a["msg2"]']
+    assert messages(s3) == [b'a["msg1"]']
+    # no echo to the sender
+    assert bus1.received == 0
+    assert not s1._queue
+
+    await bus1.close()
+    await bus2.close()
+    assert broker.nodes == []
+
+
+async def test_local_bus_publish(make_node):
+    broker = LocalBroker()
+    bus1, bus2 = LocalBus(broker), LocalBus(broker)
+    sm1 = make_node(bus1)
+    sm2 = make_node(bus2)
+    other = make_node(bus2, name="other")
+    s1 = add_session(sm2, "s1")
+    s2 = add_session(sm2, "s2")
+    s3 = add_session(other, "s3")
+    sm2.subscribe(s1, "news.*")
+    other.subscribe(s3, "news.*")
+
+    assert sm1.publish("news.sport", "goal") == 0
+    sm1.publish("weather", "rain")
+    await asyncio.sleep(0)
+
+    assert messages(s1) == [b'a["goal"]']
+    assert not s2._queue
+    # managers are matched by name
+    assert not s3._queue
+
+
+def test_record_roundtrip():
+    batch = [
+        BusMessage(BusMessageType.BROADCAST, "sm", b'a["msg"]', exclude=("s1",)),
+        BusMessage(BusMessageType.PUBLISH, "sm", b'a["\\u044e"]', topic="a.b"),
+    ]
+    data = encode_batch(batch)
+    first = encode_batch(batch[:1])
+    assert decode_record(first) == batch[0]
+    assert decode_record(data[len(first):]) == batch[1]
+
+
+async def test_unix_socket_bus(make_node, tmp_path):
+    path = str(tmp_path / "bus.sock")
+    broker = UnixSocketBroker(path)
+    await broker.start()
+    bus1, bus2 = UnixSocketBus(path), UnixSocketBus(path)
+    sm1 = make_node(bus1)
+    sm2 = make_node(bus2)
+    s2 = add_session(sm2, "s2")
+
+    # published before the connection, sent on start
+    sm1.broadcast("msg0")
+    await bus1.start()
+    await bus2.start()
+    await asyncio.sleep(0.01)
+    for idx in range(1, 4):
+        sm1.broadcast("msg%d" % idx)
+
+    for _ in range(100):
+        if bus2.received == 3:
+            break
+        await asyncio.sleep(0.01)
+    assert messages(s2) == [b'a["msg1"]', b'a["msg2"]', b'a["msg3"]']
+    assert bus1.sent == 4
+
+    await bus1.close()
+    await bus2.close()
+    await broker.close()
+
+
+def test_abstract_bus():
+    with pytest.raises(TypeError):
+        Bus()
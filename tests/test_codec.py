@@ -0,0 +1,98 @@
+import datetime
+import json
+import re
+
+import pytest
+
+from sockjs import MsgType, add_endpoint
+from sockjs.codec import Codec, JSONCodec, MsgspecCodec, OrjsonCodec
+
+
+def make_codecs():
+    codecs = [JSONCodec()]
+    for cls in (OrjsonCodec, MsgspecCodec):
+        try:
+            codecs.append(cls())
+        except RuntimeError:
+            pass
+    return codecs
+
+
+@pytest.fixture(params=make_codecs(), ids=lambda codec: codec.name)
+def codec(request):
+    return request.param
+
+
+def test_dumps(codec):
+    data = codec.dumps({"key": ["юникод", 1, None]})
+    assert isinstance(data, bytes)
+    assert json.loads(data) == {"key": ["юникод", 1, None]}
+
+
+@pytest.mark.parametrize("data", [b'["msg1","msg2"]', '["msg1","msg2"]'])
+def test_loads(codec, data):
+    assert codec.loads(data) == ["msg1", "msg2"]
+
+
+def test_loads_broken(codec):
+    with pytest.raises(Exception):
+        codec.loads(b"{]")
+
+
+def test_frames(codec):
+    assert codec.message_frame("msg1") == b'a["msg1"]'
+    assert codec.messages_frame(["msg1", "msg2"]) == b'a["msg1","msg2"]'
+    assert codec.close_frame(3000, "Go away!") == b'c[3000,"Go away!"]'
+
+
+def test_escaped_characters(codec):
+    ranges = [(0x200C, 0x200F), (0x2028, 0x202F), (0x2060, 0x206F), (0xFFF0, 0xFFFF)]
+    chars = "".join(chr(i) for start, end in ranges for i in range(start, end + 1))
+    frame = codec.message_frame("a%sb" % chars)
+    assert not re.search(
+        "[\u200c-\u200f\u2028-\u202f\u2060-\u206f\ufff0-\uffff]",
+        frame.decode(),
+    )
+    assert "\\u2028" in frame.decode()
+    assert json.loads(frame[1:]) == ["a%sb" % chars]
+    assert codec.loads(frame[1:]) == ["a%sb" % chars]
+    assert codec.dumps("é").decode() in ('"é"', '"\\u00e9"')
+
+
+def test_json_codec_datetime():
+    codec = JSONCodec()
+    dt = datetime.datetime(2024, 6, 13, 10, 20, 30)
+    assert codec.dumps(dt) == b'"Thu, 13 Jun 2024 10:20:30 -0000"'
+
+
+async def test_endpoint_codec(app, aiohttp_client, codec):
+    received = []
+
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            received.append(msg.data)
+            session.send(msg.data.upper())
+
+    add_endpoint(app, handler, name="main", codec=codec)
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/sockjs/000/codec/xhr")
+    assert await resp.read() == b"o\n"
+
+    resp = await client.post("/sockjs/000/codec/xhr_send", data=b'["msg1"]')
+    assert resp.status == 204
+    resp = await client.post(
+        "/sockjs/000/codec/jsonp_send",
+        data=b"d=%5B%22msg+2%22%5D",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert await resp.read() == b"ok"
+    assert received == ["msg1", "msg 2"]
+
+    resp = await client.post("/sockjs/000/codec/xhr")
+    assert await resp.read() == b'a["MSG1","MSG 2"]\n'
+
+
+def test_abstract_codec():
+    with pytest.raises(TypeError):
+        Codec()
@@ -0,0 +1,130 @@
+import asyncio
+
+from sockjs import InboundLimits, MsgType, SessionManager, SessionState
+from sockjs.dispatch import InboundDispatcher
+from sockjs.protocol import SockjsMessage
+
+
+def message(data):
+    return SockjsMessage(MsgType.MESSAGE, data)
+
+
+async def test_order_and_cleanup():
+    handled = []
+
+    async def call(session, msg):
+        await asyncio.sleep(0)
+        handled.append((session, msg.data))
+
+    dispatcher = InboundDispatcher(InboundLimits(), call)
+    for idx in range(3):
+        await dispatcher.put("s1", message(idx))
+        await dispatcher.put("s2", message(idx))
+    assert dispatcher.queued("s1") == 3
+    assert len(dispatcher) == 2
+
+    await dispatcher.join()
+    assert [data for s, data in handled if s == "s1"] == [0, 1, 2]
+    assert [data for s, data in handled if s == "s2"] == [0, 1, 2]
+    assert len(dispatcher) == 0
+
+
+async def test_max_handlers():
+    running = 0
+    peak = 0
+
+    async def call(session, msg):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+
+    dispatcher = InboundDispatcher(InboundLimits(max_handlers=2), call)
+    for sid in range(10):
+        await dispatcher.put("s%d" % sid, message(sid))
+    await dispatcher.join()
+    assert peak == 2
+
+
+async def test_backpressure():
+    release = asyncio.Event()
+    handled = []
+
+    async def call(session, msg):
+        await release.wait()
+        handled.append(msg.data)
+
+    dispatcher = InboundDispatcher(InboundLimits(max_messages=2), call)
+    await dispatcher.put("s1", message(0))
+    await asyncio.sleep(0)  # message 0 is taken by the handler
+    await dispatcher.put("s1", message(1))
+    await dispatcher.put("s1", message(2))
+
+    blocked = asyncio.ensure_future(dispatcher.put("s1", message(3)))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    # close messages are never blocked
+    await dispatcher.put("s1", SockjsMessage(MsgType.CLOSE, None), wait=False)
+    assert dispatcher.queued("s1") == 3
+
+    release.set()
+    await blocked
+    await dispatcher.join()
+    assert handled == [0, 1, 2, None, 3]
+
+
+async def test_cancel_releases_senders():
+    async def call(session, msg):
+        await asyncio.sleep(10)
+
+    dispatcher = InboundDispatcher(InboundLimits(max_messages=1), call)
+    await dispatcher.put("s1", message(0))
+    await asyncio.sleep(0)
+    await dispatcher.put("s1", message(1))
+    blocked = asyncio.ensure_future(dispatcher.put("s1", message(2)))
+    await asyncio.sleep(0)
+
+    dispatcher.cancel()
+    await asyncio.sleep(0)
+    await blocked
+    assert len(dispatcher) == 1  # the new message started a task
+    dispatcher.cancel()
+    await asyncio.sleep(0)
+    assert len(dispatcher) == 0
+
+
+async def test_manager_close_after_messages(app, mocker):
+    handled = []
+    gate = asyncio.Event()
+
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            await gate.wait()
+        handled.append(msg.type)
+        if msg.data == "fail":
+            raise ValueError()
+
+    manager = SessionManager("sm", app, handler, inbound_limits=InboundLimits())
+    session = manager.get("s1", True)
+    session.state = SessionState.OPEN
+    session.disconnect_delay = 0
+    log = mocker.patch("sockjs.session.log")
+
+    await manager.remote_messages(session, ["msg", "fail"])
+    await manager.remote_close(session)
+    await manager.remote_closed(session)
+    assert handled == []
+    assert session.state == SessionState.CLOSED
+
+    gate.set()
+    await manager.dispatcher.join()
+    assert handled == [
+        MsgType.MESSAGE,
+        MsgType.MESSAGE,
+        MsgType.CLOSE,
+        MsgType.CLOSED,
+    ]
+    log.exception.assert_called_once_with("Exception in message handler.")
+    await manager.stop()
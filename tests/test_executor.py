@@ -0,0 +1,157 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from sockjs import (
+    HandlerExecutor,
+    MsgType,
+    SessionManager,
+    SessionState,
+    add_endpoint,
+    get_manager,
+)
+from sockjs.protocol import Frame
+from sockjs.transports.base import HTTPClientClosedConnection
+
+
+def echo(manager, session, msg):
+    if msg.type == MsgType.MESSAGE:
+        session.send("%s:%s" % (session.id, msg.data))
+        manager.broadcast("all")
+
+
+def record(manager, session, msg):
+    if msg.type == MsgType.CLOSE:
+        assert isinstance(msg.data, str)
+    elif msg.type == MsgType.MESSAGE:
+        if msg.data == "exit":
+            os._exit(1)
+        session.send(msg.data)
+
+
+@pytest.fixture
+async def make_executor():
+    executors = []
+
+    def maker(*args, **kwargs):
+        executor = HandlerExecutor(*args, **kwargs)
+        executors.append(executor)
+        return executor
+
+    yield maker
+
+    for executor in executors:
+        await executor.close()
+
+
+def queued(session):
+    messages = []
+    for frame, data in session._queue:
+        if frame == Frame.MESSAGE:
+            messages.extend(data)
+        else:
+            messages.append(data)
+    return messages
+
+
+async def test_thread_executor(app, make_executor):
+    threads = {}
+    loop_thread = threading.current_thread()
+
+    def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            assert threading.current_thread() is not loop_thread
+            threads.setdefault(session.id, set()).add(threading.current_thread())
+            session.send(msg.data)
+
+    executor = make_executor(4)
+    manager = SessionManager("sm", app, handler, executor=executor)
+    sessions = [manager.get("s%d" % idx, True) for idx in range(8)]
+    for session in sessions:
+        session.state = SessionState.OPEN
+
+    await asyncio.gather(
+        *(
+            manager.remote_messages(session, ["m%d" % idx for idx in range(20)])
+            for session in sessions
+        )
+    )
+    for session in sessions:
+        assert queued(session) == ["m%d" % idx for idx in range(20)]
+        assert len(threads[session.id]) == 1
+    await manager.stop()
+
+
+async def test_handler_exception(app, make_executor, mocker):
+    def handler(manager, session, msg):
+        raise ValueError()
+
+    manager = SessionManager("sm", app, handler, executor=make_executor(1))
+    session = manager.get("s1", True)
+    log = mocker.patch("sockjs.session.log")
+    await manager.remote_message(session, "msg")
+    log.exception.assert_called_once_with("Exception in message handler.")
+    await manager.stop()
+
+
+def test_proxy_calls():
+    from sockjs.executor import SessionProxy
+
+    calls = []
+    proxy = SessionProxy("s1", SessionState.OPEN, calls)
+    proxy.send("msg")
+    proxy.close(3000, "Go away!")
+    assert calls == [
+        ("session", "send", ("msg",), {}),
+        ("session", "close", (3000, "Go away!"), {}),
+    ]
+    with pytest.raises(AttributeError):
+        proxy.get_frame
+
+
+async def test_process_executor(app, make_executor):
+    executor = make_executor(2, ProcessPoolExecutor)
+    add_endpoint(app, echo, name="sm", executor=executor)
+    manager = get_manager("sm", app)
+    s1 = manager.get("s1", True)
+    s2 = manager.get("s2", True)
+    s1.state = s2.state = SessionState.OPEN
+
+    await manager.remote_messages(s1, ["a", "b"])
+    assert queued(s1) == ["s1:a", b'a["all"]', "s1:b", b'a["all"]']
+    assert queued(s2) == [b'a["all"]', b'a["all"]']
+    await manager.stop()
+
+
+async def test_process_executor_client_disconnect(app, make_executor, mocker):
+    executor = make_executor(1, ProcessPoolExecutor)
+    manager = SessionManager("sm", app, record, executor=executor)
+    s1 = manager.get("s1", True)
+    s1.state = SessionState.OPEN
+    log = mocker.patch("sockjs.session.log")
+
+    await manager.remote_close(s1, exc=HTTPClientClosedConnection())
+    assert not log.exception.called
+
+    s2 = manager.get("s2", True)
+    s2.state = SessionState.OPEN
+    await manager.remote_message(s2, "msg")
+    assert queued(s2) == ["msg"]
+    await manager.stop()
+
+
+async def test_process_executor_replaces_dead_worker(app, make_executor, mocker):
+    executor = make_executor(1, ProcessPoolExecutor)
+    manager = SessionManager("sm", app, record, executor=executor)
+    session = manager.get("s1", True)
+    session.state = SessionState.OPEN
+    log = mocker.patch("sockjs.session.log")
+
+    await manager.remote_message(session, "exit")
+    log.exception.assert_called_once_with("Exception in message handler.")
+    await manager.remote_message(session, "msg")
+    assert queued(session) == ["msg"]
+    await manager.stop()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from sockjs import Frame, SessionState, add_endpoint, get_manager
+from sockjs.heartbeat import HeartbeatScheduler
+
+
+async def test_heartbeat(make_session):
+    scheduler = HeartbeatScheduler(resolution=0.01, jitter=0)
+    session = make_session("test")
+    session._send_heartbeats = True
+    session.next_heartbeat = time.monotonic() + 0.02
+
+    scheduler.add(session)
+    assert session in scheduler
+    await asyncio.sleep(0.05)
+
+    assert list(session._queue) == [(Frame.HEARTBEAT, b"h")]
+    assert session._heartbeats == 1
+    assert scheduler.heartbeats == 1
+    assert session in scheduler
+    scheduler.clear()
+
+
+async def test_heartbeat_postponed_by_tick(make_session):
+    scheduler = HeartbeatScheduler(resolution=0.01, jitter=0)
+    session = make_session("test")
+    session._send_heartbeats = True
+    session.next_heartbeat = time.monotonic() + 0.02
+
+    scheduler.add(session)
+    session.tick(1)
+    await asyncio.sleep(0.05)
+
+    assert list(session._queue) == []
+    assert session in scheduler
+    scheduler.clear()
+
+
+async def test_heartbeat_discard(make_session):
+    scheduler = HeartbeatScheduler(resolution=0.01, jitter=0)
+    session = make_session("test")
+    session._send_heartbeats = True
+    session.next_heartbeat = time.monotonic()
+
+    scheduler.add(session)
+    scheduler.discard(session)
+    await asyncio.sleep(0.03)
+
+    assert list(session._queue) == []
+    assert session not in scheduler
+    assert len(scheduler) == 0
+
+
+async def test_heartbeat_batches(make_session):
+    scheduler = HeartbeatScheduler(resolution=0.01, jitter=0, batch_size=2)
+    sessions = [make_session("s%d" % idx) for idx in range(5)]
+    for session in sessions:
+        session._send_heartbeats = True
+        session.next_heartbeat = time.monotonic()
+        scheduler.add(session)
+
+    await asyncio.sleep(0.05)
+    assert all(session._heartbeats == 1 for session in sessions)
+    scheduler.clear()
+
+
+async def test_pong_timeout(make_session):
+    scheduler = HeartbeatScheduler(resolution=0.01)
+    session = make_session("test")
+    session.state = SessionState.OPEN
+
+    scheduler.wait_pong(session, 0.02)
+    await asyncio.sleep(0.05)
+
+    assert session.state == SessionState.CLOSING
+    assert list(session._queue) == [
+        (Frame.CLOSE, (3000, "No response from heartbeat"))
+    ]
+    assert scheduler.pong_timeouts == 1
+
+
+async def test_pong_received(make_session):
+    scheduler = HeartbeatScheduler(resolution=0.01)
+    session = make_session("test")
+    session.state = SessionState.OPEN
+
+    scheduler.wait_pong(session, 0.02)
+    scheduler.pong(session)
+    await asyncio.sleep(0.05)
+
+    assert session.state == SessionState.OPEN
+    assert list(session._queue) == []
+
+
+async def test_endpoint_arguments(app, make_handler):
+    add_endpoint(
+        app,
+        make_handler([]),
+        name="main",
+        heartbeat_resolution=0.1,
+        heartbeat_jitter=0,
+    )
+    scheduler = get_manager("main", app).heartbeat_scheduler
+    assert scheduler.resolution == 0.1
+    assert scheduler.jitter == 0
@@ -0,0 +1,118 @@
+from aiohttp import web
+
+from sockjs import Metrics, MsgType, add_endpoint, get_manager
+from sockjs.metrics import Histogram, render
+
+
+def test_histogram():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    assert list(histogram.samples("h", 'a="b"')) == [
+        'h_bucket{a="b",le="1"} 2',
+        'h_bucket{a="b",le="5"} 3',
+        'h_bucket{a="b",le="+Inf"} 4',
+        'h_sum{a="b"} 14.5',
+        'h_count{a="b"} 4',
+    ]
+
+
+def test_render_without_metrics(make_manager):
+    manager = make_manager()
+    lines = render([manager]).splitlines()
+    assert "# TYPE sockjs_sessions gauge" in lines
+    assert not [line for line in lines if not line.startswith("#")]
+
+
+async def test_metrics_route(aiohttp_client):
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            session.send(msg.data)
+
+    app = web.Application()
+    add_endpoint(app, handler, name="main", metrics_route="/metrics")
+    add_endpoint(app, handler, name="other", prefix="/other", metrics_route="/metrics")
+    metrics = Metrics()
+    add_endpoint(app, handler, name="third", prefix="/third", metrics=metrics)
+    assert get_manager("third", app).metrics is metrics
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b"o\n"
+    resp = await client.post("/sockjs/000/s1/xhr_send", data=b'["a", "b"]')
+    assert resp.status == 204
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'a["a","b"]\n'
+
+    resp = await client.get("/metrics")
+    assert resp.status == 200
+    assert resp.content_type == "text/plain"
+    lines = (await resp.text()).splitlines()
+
+    # the session has no connection between polls
+    assert 'sockjs_sessions{endpoint="main",state="open",transport=""} 1' in lines
+    assert 'sockjs_messages_received_total{endpoint="main"} 2' in lines
+    assert 'sockjs_messages_received_total{endpoint="other"} 0' in lines
+    assert 'sockjs_messages_received_total{endpoint="third"} 0' in lines
+    assert (
+        'sockjs_bytes_received_total{endpoint="main",transport="xhr-polling"} 10'
+        in lines
+    )
+    assert (
+        'sockjs_frames_sent_total{endpoint="main",transport="xhr-polling"} 2'
+        in lines
+    )
+    assert (
+        'sockjs_bytes_sent_total{endpoint="main",transport="xhr-polling"} 13'
+        in lines
+    )
+    assert 'sockjs_queue_depth_count{endpoint="main"} 1' in lines
+    assert (
+        'sockjs_handler_duration_seconds_count{endpoint="main",type="open"} 1'
+        in lines
+    )
+    assert (
+        'sockjs_handler_duration_seconds_count{endpoint="main",type="message"} 2'
+        in lines
+    )
+    assert 'sockjs_heartbeats_total{endpoint="main"} 0' in lines
+    assert lines.count("# TYPE sockjs_sessions gauge") == 1
+
+
+async def test_gc_duration(make_manager):
+    manager = make_manager()
+    manager.metrics = Metrics()
+    await manager._gc_expired_sessions()
+    assert manager.metrics.gc_duration.count == 1
+
+
+async def test_websocket_bytes_received(aiohttp_client):
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            session.send(msg.data)
+
+    app = web.Application()
+    add_endpoint(app, handler, name="main", metrics_route="/metrics")
+    client = await aiohttp_client(app)
+
+    ws = await client.ws_connect("/sockjs/000/s1/websocket")
+    assert await ws.receive_str() == "o"
+    await ws.send_str('["юникод"]')
+    assert await ws.receive_str() == 'a["\\u044e\\u043d\\u0438\\u043a\\u043e\\u0434"]'
+    await ws.close()
+
+    ws = await client.ws_connect("/sockjs/websocket")
+    await ws.send_str("юникод")
+    assert await ws.receive_str() == "юникод"
+    await ws.close()
+
+    lines = (await (await client.get("/metrics")).text()).splitlines()
+    assert (
+        'sockjs_bytes_received_total{endpoint="main",transport="websocket"} 16'
+        in lines
+    )
+    assert (
+        'sockjs_bytes_received_total{endpoint="main",transport="websocket-raw"} 12'
+        in lines
+    )
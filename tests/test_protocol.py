@@ -1,4 +1,7 @@
 import json
+from unittest import mock
+
+import pytest
 
 from sockjs import protocol
 
@@ -17,14 +20,35 @@ def test_decode():
 
 def test_close_frame():
     msg = protocol.close_frame(1000, "Internal error")
-    assert msg == 'c[1000,"Internal error"]'
+    assert msg == b'c[1000,"Internal error"]'
 
 
 def test_message_frame():
     msg = protocol.message_frame("msg1")
-    assert msg == "a%s" % protocol.dumps(["msg1"])
+    assert msg == b"a%s" % protocol.dumps(["msg1"]).encode()
 
 
 def test_messages_frame():
     msg = protocol.messages_frame(["msg1", "msg2"])
-    assert msg == "a%s" % protocol.dumps(["msg1", "msg2"])
+    assert msg == b"a%s" % protocol.dumps(["msg1", "msg2"]).encode()
+
+
+def test_frame_blob_wire():
+    blob = protocol.FrameBlob(protocol.message_frame("msg1"))
+    assert blob == b'a["msg1"]'
+
+    encode = mock.Mock(side_effect=lambda frame: frame + b"\n")
+    assert blob.wire("key", encode) == b'a["msg1"]\n'
+    assert blob.wire("key", encode) == b'a["msg1"]\n'
+    assert encode.call_count == 1
+
+    assert blob.wire("other", bytes.upper) == b'A["MSG1"]'
+
+
+@pytest.mark.parametrize(
+    "text", ["text data", 'a["\\"quoted\\""]', "new\nline\x01", "юникод\u2028"]
+)
+def test_quote_frame(text):
+    quoted = protocol.quote_frame(text.encode())
+    assert json.loads(quoted) == text
+    assert b"\xe2\x80\xa8" not in quoted
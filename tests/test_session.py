@@ -1,40 +1,48 @@
 import asyncio
+import time
+import tracemalloc
 from asyncio import ensure_future
-from datetime import datetime, timedelta
 from unittest import mock
 
 import pytest
 from aiohttp import web
 
 from sockjs import (
+    BatchWindow,
+    OverflowPolicy,
+    Priority,
+    QueueLimits,
     Session,
+    SessionManager,
     SessionIsAcquired,
     SessionIsClosed,
     protocol,
     SessionState,
     Frame,
+    add_endpoint,
+    get_manager,
 )
 
+# bytes per idle session, see the docstring of Session
+SESSION_MEMORY_BUDGET = 512
 
-class TestSession:
-    async def test_ctor(self, mocker):
-        dt = mocker.patch("sockjs.session.datetime")
-        now = dt.now.return_value = datetime.now()
 
-        session = Session("id")
+class TestSession:
+    async def test_ctor(self, clock):
+        session = Session("id", clock=clock)
         assert session.id == "id"
         assert not session.expired
-        assert session.expires == now + timedelta(seconds=5)
+        assert session.expires == clock.now + 5
 
         assert session._hits == 0
         assert session._heartbeats == 0
         assert session.state == SessionState.NEW
 
-        session = Session("id", disconnect_delay=15)
+        session = Session("id", disconnect_delay=15, clock=clock)
 
         assert session.id == "id"
         assert not session.expired
-        assert session.expires == now + timedelta(seconds=15)
+        assert session.expires == clock.now + 15
 
     async def test_str(self, make_session):
         session = make_session("test")
@@ -58,36 +66,32 @@ class TestSession:
         expected = "id='test' connected acquired queue[1] hits=10 heartbeats=50"
         assert str(session) == expected
 
-    async def test_tick(self, mocker, make_session):
-        dt = mocker.patch("sockjs.session.datetime")
-        now = dt.now.return_value = datetime.now()
-        session = make_session("test")
+    async def test_tick(self, clock, make_session):
+        session = make_session("test", clock=clock)
 
-        now = dt.now.return_value = now + timedelta(hours=1)
+        clock.now += 3600
         session.tick()
-        assert session.next_heartbeat == now + timedelta(
-            seconds=session.heartbeat_delay
-        )
+        assert session.next_heartbeat == clock.now + session.heartbeat_delay
 
-    async def test_tick_different_timeoutk(self, mocker, make_session):
-        dt = mocker.patch("sockjs.session.datetime")
-        now = dt.now.return_value = datetime.now()
-        session = make_session("test", disconnect_delay=20)
+    async def test_tick_different_timeoutk(self, clock, make_session):
+        session = make_session("test", disconnect_delay=20, clock=clock)
 
-        now = dt.now.return_value = now + timedelta(hours=1)
+        clock.now += 3600
         session.tick()
-        assert session.next_heartbeat == now + timedelta(
-            seconds=session.heartbeat_delay
-        )
+        assert session.next_heartbeat == clock.now + session.heartbeat_delay
 
-    async def test_tick_custom(self, mocker, make_session):
-        dt = mocker.patch("sockjs.session.datetime")
-        now = dt.now.return_value = datetime.now()
-        session = make_session("test", disconnect_delay=20)
+    async def test_tick_custom(self, clock, make_session):
+        session = make_session("test", disconnect_delay=20, clock=clock)
 
-        now = dt.now.return_value = now + timedelta(hours=1)
+        clock.now += 3600
         session.tick(30)
-        assert session.next_heartbeat == now + timedelta(seconds=30)
+        assert session.next_heartbeat == clock.now + 30
+
+    async def test_tick_with_now(self, clock, make_session):
+        session = make_session("test", clock=clock)
+
+        session.tick(now=100.0)
+        assert session.next_heartbeat == 100.0 + session.heartbeat_delay
 
     async def test_heartbeat(self, make_session):
         session = make_session("test")
@@ -102,19 +106,30 @@ class TestSession:
         session = make_session("test")
         session._send_heartbeats = True
         session.heartbeat()
-        assert list(session._queue) == [(Frame.HEARTBEAT, Frame.HEARTBEAT.value)]
-
-    async def test_expire(self, make_session, mocker):
-        dt = mocker.patch("sockjs.session.datetime")
-        now = dt.now.return_value = datetime.now()
+        assert list(session._queue) == [(Frame.HEARTBEAT, b"h")]
 
-        session = make_session("test", disconnect_delay=5)
+    async def test_expire(self, make_session, clock):
+        session = make_session("test", disconnect_delay=5, clock=clock)
         session.expire()
-        assert session.expires == now + timedelta(seconds=5)
+        assert session.expires == clock.now + 5
         assert not session.expired
-        dt.now.return_value = now + timedelta(seconds=5)
+        clock.now += 5
         assert session.expired
 
+    async def test_expired_at(self, make_session, clock):
+        session = make_session("test", disconnect_delay=5, clock=clock)
+        assert not session.expired_at(clock.now + 4)
+        assert session.expired_at(clock.now + 5)
+
+        session.expires = None
+        assert not session.expired_at(clock.now + 3600)
+
+    async def test_wall_clock_jump(self, make_session, mocker):
+        session = make_session("test", disconnect_delay=5)
+        time = mocker.patch("time.time")
+        time.return_value = 10**10
+        assert not session.expired
+
     async def test_send(self, make_session):
         session = make_session("test")
         session.send("message")
@@ -137,8 +152,12 @@ class TestSession:
 
         session.state = SessionState.OPEN
         session.send_frame('a["message"]')
+        session.send_frame(b'a["message2"]')
 
-        assert list(session._queue) == [(Frame.MESSAGE_BLOB, 'a["message"]')]
+        assert list(session._queue) == [
+            (Frame.MESSAGE_BLOB, b'a["message"]'),
+            (Frame.MESSAGE_BLOB, b'a["message2"]'),
+        ]
 
     async def test_feed(self, make_session):
         session = make_session("test")
@@ -151,6 +170,11 @@ class TestSession:
             (Frame.MESSAGE, ["msg"]),
             (Frame.CLOSE, (3001, "reason")),
         ]
+        assert session.queue_depths == {
+            Priority.CONTROL: 1,
+            Priority.HIGH: 0,
+            Priority.NORMAL: 2,
+        }
 
     async def test_feed_msg_packing(self, make_session):
         session = make_session("test")
@@ -185,7 +209,7 @@ class TestSession:
         ensure_future(send())
         frame, payload = await s.get_frame()
         assert frame == Frame.MESSAGE
-        assert payload == 'a["msg1"]'
+        assert payload == b'a["msg1"]'
 
     async def test_wait_closed(self, make_session):
         s = make_session("test")
@@ -199,7 +223,7 @@ class TestSession:
         s.feed(Frame.MESSAGE, "msg1")
         frame, payload = await s.get_frame()
         assert frame == Frame.MESSAGE
-        assert payload == 'a["msg1"]'
+        assert payload == b'a["msg1"]'
 
     async def test_wait_close(self, make_session):
         s = make_session("test")
@@ -207,7 +231,7 @@ class TestSession:
         s.feed(Frame.CLOSE, (3000, "Go away!"))
         frame, payload = await s.get_frame()
         assert frame == Frame.CLOSE
-        assert payload == 'c[3000,"Go away!"]'
+        assert payload == b'c[3000,"Go away!"]'
 
     async def test_wait_message_unpack(self, make_session):
         s = make_session("test")
@@ -225,6 +249,111 @@ class TestSession:
         assert frame == Frame.CLOSE
         assert payload == (3000, "Go away!")
 
+    async def test_get_frames(self, make_session):
+        s = make_session("test")
+        s.state = SessionState.OPEN
+        s.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        s.feed(Frame.MESSAGE, "msg1")
+        s.send_frame(b'a["msg2"]')
+        s.feed(Frame.CLOSE, (3000, "Go away!"))
+        s.feed(Frame.MESSAGE, "msg3")
+        assert await s.get_frames() == [
+            (Frame.HEARTBEAT, b"h"),
+            (Frame.MESSAGE, b'a["msg1"]'),
+            (Frame.MESSAGE_BLOB, b'a["msg2"]'),
+            (Frame.CLOSE, b'c[3000,"Go away!"]'),
+        ]
+        assert await s.get_frames() == [(Frame.MESSAGE, b'a["msg3"]')]
+
+    async def test_get_frames_max_bytes(self, make_session):
+        s = make_session("test")
+        s.state = SessionState.OPEN
+        s.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        s.send_frame(b'a["msg1"]')
+        s.send_frame(b'a["msg2"]')
+        assert await s.get_frames(max_bytes=0) == [(Frame.HEARTBEAT, b"h")]
+        assert await s.get_frames(max_bytes=5) == [
+            (Frame.MESSAGE_BLOB, b'a["msg1"]')
+        ]
+        assert await s.get_frames(max_bytes=5) == [
+            (Frame.MESSAGE_BLOB, b'a["msg2"]')
+        ]
+
+    async def test_get_frames_wait(self, make_session):
+        s = make_session("test")
+        s.state = SessionState.OPEN
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(s.get_frames(), 0.001)
+        assert s._waiter is None
+
+        async def send():
+            await asyncio.sleep(0.001)
+            s.feed(Frame.MESSAGE, "msg1")
+            s.feed(Frame.MESSAGE, "msg2")
+
+        ensure_future(send())
+        assert await s.get_frames() == [(Frame.MESSAGE, b'a["msg1","msg2"]')]
+
+    async def test_get_merged_frame(self, make_session):
+        s = make_session("test")
+        s.state = SessionState.OPEN
+        s.feed(Frame.OPEN, protocol.OPEN_FRAME)
+        s.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        s.send("msg1")
+        s.send_frame(b'a["msg2","msg3"]')
+        s.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        s.send_frame(b"a[]")
+        s.send("msg4")
+        s.feed(Frame.CLOSE, (3000, "Go away!"))
+        assert await s.get_merged_frame() == (Frame.OPEN, b"o")
+        assert await s.get_merged_frame() == (
+            Frame.MESSAGE,
+            b'a["msg1","msg2","msg3","msg4"]',
+        )
+        assert await s.get_merged_frame() == (Frame.CLOSE, b'c[3000,"Go away!"]')
+
+    async def test_get_merged_frame_single(self, make_session):
+        s = make_session("test")
+        s.state = SessionState.OPEN
+        blob = protocol.FrameBlob(b'a["msg1"]')
+        s.send_frame(blob)
+        s.send_frame(b"not an array")
+        s.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        frame, payload = await s.get_merged_frame()
+        assert frame == Frame.MESSAGE_BLOB
+        assert payload is blob
+        assert await s.get_merged_frame() == (Frame.MESSAGE_BLOB, b"not an array")
+        # the heartbeat is skipped while messages are queued
+        assert not s._has_frames()
+
+        # only messages make the heartbeat redundant
+        s.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        s.close()
+        assert await s.get_merged_frame() == (Frame.HEARTBEAT, b"h")
+        assert await s.get_merged_frame() == (Frame.CLOSE, b'c[3000,"Go away!"]')
+
+    async def test_get_merged_frame_max_bytes(self, make_session):
+        s = make_session("test")
+        s.state = SessionState.OPEN
+        for idx in range(5):
+            s.send_frame(b'a["msg%d"]' % idx)
+        assert await s.get_merged_frame(16) == (Frame.MESSAGE, b'a["msg0","msg1"]')
+        assert await s.get_merged_frame(15) == (Frame.MESSAGE_BLOB, b'a["msg2"]')
+        # a frame larger than max_bytes is sent on its own
+        assert await s.get_merged_frame(0) == (Frame.MESSAGE_BLOB, b'a["msg3"]')
+        assert await s.get_merged_frame() == (Frame.MESSAGE_BLOB, b'a["msg4"]')
+
+        s.send_frame(b'a["msg5"]')
+        s.send("msg6")
+        s.send("msg7")
+        s.send_conflated("key", "msg8")
+        assert await s.get_merged_frame(22) == (Frame.MESSAGE_BLOB, b'a["msg5"]')
+        assert await s.get_merged_frame(23) == (
+            Frame.MESSAGE,
+            b'a["msg6","msg7","msg8"]',
+        )
+
     async def test_close(self, make_session):
         session = make_session("test")
         session.state = SessionState.OPEN
@@ -251,21 +380,19 @@ class TestSession:
         manager = make_manager(handler)
         session = make_session(manager=manager)
         assert session.state == SessionState.NEW
-        assert session._hb_task is None
+        assert session not in manager.heartbeat_scheduler
         assert not session._send_heartbeats
 
         await manager.acquire(session, request=make_request("GET", "/test/"))
         assert session.state == SessionState.OPEN
         assert session._send_heartbeats
-        assert session._hb_task is not None
-        assert list(session._queue) == [(Frame.OPEN, Frame.OPEN.value)]
+        assert session in manager.heartbeat_scheduler
+        assert list(session._queue) == [(Frame.OPEN, b"o")]
         assert messages == [(protocol.OPEN_MESSAGE, session)]
 
-        hb_task = session._hb_task
-        session.release()
+        await manager.release(session)
         assert not session._send_heartbeats
-        assert session._hb_task is None
-        assert hb_task._must_cancel
+        assert session not in manager.heartbeat_scheduler
 
     async def test_acquire_exception_in_handler(
         self, make_manager, make_session, make_request
@@ -282,7 +409,7 @@ class TestSession:
         assert session._send_heartbeats
         assert session.interrupted
         assert list(session._queue) == [
-            (Frame.OPEN, Frame.OPEN.value),
+            (Frame.OPEN, b"o"),
             (Frame.CLOSE, (3000, "Internal error")),
         ]
 
@@ -355,12 +482,12 @@ class TestSession:
         session = make_session(manager=manager)
 
         await manager.remote_closed(session)
-        assert session.expires > datetime.now()
+        assert session.expires > time.monotonic()
         assert not session.expired
         assert session.state == SessionState.NEW
         assert messages == []
 
-        session.expires = datetime.now()
+        session.expires = time.monotonic()
         assert session.expired
         await manager.remote_closed(session)
         assert session.state == SessionState.CLOSED
@@ -405,7 +532,7 @@ class TestSession:
         session = make_session(manager=manager, disconnect_delay=0)
         session._waiter = waiter = asyncio.Future()
 
-        now = datetime.now()
+        now = time.monotonic()
         await manager.remote_closed(session)
         assert waiter.done()
         assert session.expires <= now
@@ -424,7 +551,7 @@ class TestSession:
         manager = make_manager(handler)
         session = make_session(disconnect_delay=0)
 
-        now = datetime.now()
+        now = time.monotonic()
         await manager.remote_closed(session)
         assert session.expires <= now
         assert session.expired
@@ -471,6 +598,26 @@ class TestSession:
         await manager.remote_messages(session, ("msg1", "msg2"))
         assert messages == []
 
+    async def test_remote_messages_batch(
+        self, make_session, make_manager, make_handler
+    ):
+        messages = []
+        handler = make_handler(result=messages)
+        manager = make_manager(handler)
+        manager.batch_messages = True
+        session = make_session(manager=manager)
+
+        await manager.remote_messages(session, ["msg1", "msg2"])
+        await manager.remote_messages(session, [])
+        await manager.remote_message(session, "msg3")
+        assert messages == [
+            (
+                protocol.SockjsMessage(protocol.MsgType.MESSAGES, ["msg1", "msg2"]),
+                session,
+            ),
+            (protocol.SockjsMessage(protocol.MsgType.MESSAGE, "msg3"), session),
+        ]
+
 
 class TestSessionManager:
     async def test_request_available(self, make_manager, make_request):
@@ -499,7 +646,7 @@ class TestSessionManager:
         sm = make_manager()
         session = make_session(disconnect_delay=0)
         session.expire()
-        assert session.expires <= datetime.now()
+        assert session.expires <= time.monotonic()
 
         with pytest.raises(ValueError):
             sm._add(session)
@@ -527,13 +674,13 @@ class TestSessionManager:
         assert s.id in sm.sessions
         assert isinstance(s, Session)
 
-    async def test_acquire(self, make_manager, make_session, make_request):
+    async def test_acquire(self, make_manager, make_session, make_request, mocker):
         sm = make_manager()
         s1 = make_session()
         sm._add(s1)
-        s1.acquire = mock.Mock()
-        s1.acquire.return_value = asyncio.Future()
-        s1.acquire.return_value.set_result(True)
+        acquire = mocker.patch.object(Session, "acquire")
+        acquire.return_value = asyncio.Future()
+        acquire.return_value.set_result(True)
 
         s2 = await sm.acquire(s1, request=make_request("GET", "/test/"))
 
@@ -541,7 +688,7 @@ class TestSessionManager:
         assert s1.id in sm.acquired
         assert sm.acquired[s1.id]
         assert sm.is_acquired(s1)
-        assert s1.acquire.called
+        assert acquire.called
 
     async def test_acquire_unknown(self, make_manager, make_session, make_request):
         sm = make_manager()
@@ -558,17 +705,17 @@ class TestSessionManager:
         with pytest.raises(SessionIsAcquired):
             await sm.acquire(s, request=make_request("GET", "/test/"))
 
-    async def test_release(self, make_manager, make_request):
+    async def test_release(self, make_manager, make_request, mocker):
         sm = make_manager()
         s = sm.get("test", True)
-        s.release = mock.Mock()
+        release = mocker.patch.object(Session, "release")
 
         await sm.acquire(s, request=make_request("GET", "/test/"))
         await sm.release(s)
 
         assert "test" not in sm.acquired
         assert not sm.is_acquired(s)
-        assert s.release.called
+        assert release.called
 
     async def test_active_sessions(self, make_manager):
         sm = make_manager()
@@ -591,8 +738,91 @@ class TestSessionManager:
         s2.state = SessionState.OPEN
         sm.broadcast("msg")
 
-        assert list(s1._queue) == [(Frame.MESSAGE_BLOB, 'a["msg"]')]
-        assert list(s2._queue) == [(Frame.MESSAGE_BLOB, 'a["msg"]')]
+        assert list(s1._queue) == [(Frame.MESSAGE_BLOB, b'a["msg"]')]
+        assert list(s2._queue) == [(Frame.MESSAGE_BLOB, b'a["msg"]')]
+
+    async def test_broadcast_reads_clock_once(self, app, make_handler, mocker):
+        clock = mocker.Mock(return_value=1000.0)
+        sm = SessionManager("sm", app, make_handler([]), clock=clock)
+        for idx in range(10):
+            sm.get("test%d" % idx, True).state = SessionState.OPEN
+
+        clock.reset_mock()
+        sm.broadcast("msg")
+        assert clock.call_count == 1
+        await sm.stop()
+
+    async def test_publish(self, make_manager):
+        sm = make_manager()
+        s1 = sm.get("test1", True)
+        s1.state = SessionState.OPEN
+        s2 = sm.get("test2", True)
+        s2.state = SessionState.OPEN
+        s3 = sm.get("test3", True)
+        s3.state = SessionState.OPEN
+        sm.subscribe(s1, "room.1")
+        sm.subscribe(s2, "room.*")
+
+        assert sm.publish("room.1", "msg") == 2
+        assert sm.publish("room.2", "msg2", exclude={"test2"}) == 0
+        assert sm.publish("room.3", "msg3") == 1
+
+        assert list(s1._queue) == [(Frame.MESSAGE_BLOB, b'a["msg"]')]
+        assert list(s2._queue) == [
+            (Frame.MESSAGE_BLOB, b'a["msg"]'),
+            (Frame.MESSAGE_BLOB, b'a["msg3"]'),
+        ]
+        assert list(s3._queue) == []
+
+    async def test_publish_conflated(self, make_manager):
+        sm = make_manager()
+        s1 = sm.get("test1", True)
+        s1.state = SessionState.OPEN
+        s2 = sm.get("test2", True)
+        s2.state = SessionState.OPEN
+        sm.subscribe(s1, "quotes.*")
+        sm.subscribe(s2, "quotes.*")
+
+        assert sm.publish_conflated("quotes.a", "A", "A1") == 2
+        assert sm.publish_conflated("quotes.b", "B", "B1") == 2
+        assert sm.publish_conflated("quotes.a", "A", "A2", exclude={"test2"}) == 1
+        assert sm.publish_conflated("other", "A", "A3") == 0
+
+        assert await s1.get_frame() == (Frame.MESSAGE, b'a["A2","B1"]')
+        assert await s2.get_frame() == (Frame.MESSAGE, b'a["A1","B1"]')
+        with pytest.raises(AssertionError):
+            sm.publish_conflated("quotes.a", "A", {"A": 4})
+
+    async def test_unsubscribe(self, make_manager):
+        sm = make_manager()
+        s = sm.get("test", True)
+        sm.subscribe(s, "room1")
+        sm.subscribe(s, "room2")
+
+        assert sm.unsubscribe(s, "room1")
+        assert sm.topics.patterns(s) == {"room2"}
+        assert sm.unsubscribe(s)
+        assert sm.topics.patterns(s) == frozenset()
+
+    async def test_remote_closed_unsubscribes(self, make_manager):
+        sm = make_manager()
+        s = sm.get("test", True)
+        s.disconnect_delay = 0
+        sm.subscribe(s, "room1")
+
+        await sm.remote_closed(s)
+        assert s.state == SessionState.CLOSED
+        assert sm.topics.subscribers("room1") == set()
+
+    async def test_gc_unsubscribes(self, make_manager):
+        sm = make_manager()
+        s = sm.get("test", True)
+        sm.subscribe(s, "room1")
+        s.expires = time.monotonic() - 30
+
+        await sm._gc_expired_sessions()
+        assert s.id not in sm.sessions
+        assert len(sm.topics) == 0
 
     async def test_clear(self, make_manager):
         sm = make_manager()
@@ -632,8 +862,8 @@ class TestSessionManager:
         await sm.acquire(s, request=make_request("GET", "/test/"))
         await sm.release(s)
 
-        now = datetime.now()
-        s.expires = now - timedelta(seconds=30)
+        now = time.monotonic()
+        s.expires = now - 30
         assert s.expired
 
         await sm._gc_expired_sessions()
@@ -645,7 +875,7 @@ class TestSessionManager:
         sm = make_manager()
         s = make_session(manager=sm)
         await sm.acquire(s, request=make_request("GET", "/test/"))
-        s.expires = datetime.now() - timedelta(seconds=30)
+        s.expires = time.monotonic() - 30
         await sm._gc_expired_sessions()
 
         assert s.id not in sm.sessions
@@ -662,12 +892,70 @@ class TestSessionManager:
         await sm.release(s1)
         await sm.release(s2)
 
-        s1.expires = datetime.now() - timedelta(seconds=30)
+        s1.expires = time.monotonic() - 30
 
         await sm._gc_expired_sessions()
         assert s1.id not in sm.sessions
         assert s2.id in sm.sessions
 
+    async def test_gc_checks_only_expired(self, make_manager, mocker):
+        sm = make_manager()
+        s1 = sm.get("id1", True)
+        sm.get("id2", True)
+        s1.expires = time.monotonic() - 30
+
+        check = mocker.spy(sm, "_check_expiration")
+        await sm._gc_expired_sessions()
+        check.assert_called_once_with(s1, mock.ANY)
+        assert list(sm.sessions) == ["id2"]
+
+    async def test_gc_skips_outdated_deadline(self, make_manager):
+        sm = make_manager()
+        s = sm.get("id1", True)
+        s.expires = time.monotonic() - 30
+        s.expires = time.monotonic() + 30
+
+        await sm._gc_expired_sessions()
+        assert s.id in sm.sessions
+        assert s.state == SessionState.NEW
+
+    async def test_gc_released_session(self, make_manager, make_request):
+        sm = make_manager()
+        s = sm.get("id1", True)
+        await sm.acquire(s, request=make_request("GET", "/test/"))
+        assert s.expires is None
+        await sm.release(s)
+        assert s.expires is not None
+
+        s.expires = time.monotonic()
+        await sm._gc_expired_sessions()
+        assert s.id not in sm.sessions
+
+    async def test_idle_session_memory(self, make_manager):
+        sm = make_manager()
+        ids = ["%0.9d" % idx for idx in range(1000)]
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for session_id in ids:
+                sm.get(session_id, True)
+            size = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+
+        assert size / len(ids) < SESSION_MEMORY_BUDGET
+
+    async def test_session_has_no_dict(self, make_session):
+        session = make_session()
+        assert not hasattr(session, "__dict__")
+        assert session._queue == ()
+
+        session.feed(Frame.MESSAGE, "msg")
+        assert list(session._queue) == [(Frame.MESSAGE, ["msg"])]
+        await session.get_frame()
+        assert session._queue == ()
+
     async def test_emits_warning_on_del(self, make_manager, make_session):
         sm = make_manager()
         make_session("id1", manager=sm)
@@ -687,3 +975,339 @@ class TestSessionManager:
 
         await sm.clear()
         getattr(sm, "__del__")()
+
+
+class TestQueueLimits:
+    async def test_max_messages_drop_oldest(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, queue_limits=QueueLimits(max_messages=2)
+        )
+        session.feed(Frame.OPEN, Frame.OPEN.value)
+        session.send("msg1")
+        session.send_frame('a["msg2"]')
+        session.send("msg3")
+
+        assert list(session._queue) == [
+            (Frame.OPEN, Frame.OPEN.value),
+            (Frame.MESSAGE_BLOB, b'a["msg2"]'),
+            (Frame.MESSAGE, ["msg3"]),
+        ]
+        assert session.dropped == 1
+        assert session._queue.count == 2
+
+    async def test_max_bytes_drop_oldest(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, queue_limits=QueueLimits(max_bytes=10)
+        )
+        session.send("msg1")
+        session.send("msg2")
+        session.send("msg3")
+
+        assert list(session._queue) == [(Frame.MESSAGE, ["msg2", "msg3"])]
+        assert session._queue.size == 8
+        assert session.dropped == 1
+
+    async def test_message_larger_than_max_bytes(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, queue_limits=QueueLimits(max_bytes=10)
+        )
+        session.send("msg1")
+        session.send("x" * 11)
+
+        assert list(session._queue) == []
+        assert session.dropped == 2
+
+    async def test_drop_newest(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN,
+            queue_limits=QueueLimits(
+                max_messages=2, overflow=OverflowPolicy.DROP_NEWEST
+            ),
+        )
+        session.send("msg1")
+        session.send("msg2")
+        session.send("msg3")
+
+        assert list(session._queue) == [(Frame.MESSAGE, ["msg1", "msg2"])]
+        assert session.dropped == 1
+
+    async def test_close(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN,
+            queue_limits=QueueLimits(
+                max_messages=1, overflow=OverflowPolicy.CLOSE, close_code=3008
+            ),
+        )
+        session.feed(Frame.OPEN, Frame.OPEN.value)
+        session.send("msg1")
+        assert not session.send("msg2")
+        session.send("msg3")
+
+        assert session.state == SessionState.CLOSING
+        assert list(session._queue) == [
+            (Frame.OPEN, Frame.OPEN.value),
+            (Frame.CLOSE, (3008, "Queue overflow")),
+        ]
+        assert session.dropped == 2
+
+    async def test_get_frame_accounting(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, queue_limits=QueueLimits(max_messages=10)
+        )
+        session.send("msg1")
+        session.send("msg2")
+        session.send_frame('a["msg3"]')
+
+        assert await session.get_frame() == (Frame.MESSAGE, b'a["msg1","msg2"]')
+        assert session._queue.count == 1
+        assert session._queue.size == 9
+        assert await session.get_frame() == (Frame.MESSAGE_BLOB, b'a["msg3"]')
+        # the drained queue is released with its accounting
+        assert session._queue == ()
+
+    async def test_ttl(self, make_session, clock):
+        session = make_session(
+            state=SessionState.OPEN, clock=clock, queue_limits=QueueLimits(ttl=5)
+        )
+        session.send_frame('a["msg1"]')
+        session.send("msg2")
+        clock.now += 3
+        session.send("msg3")
+        session.feed(Frame.HEARTBEAT, b"h")
+        session.send_frame('a["msg4"]')
+        clock.now += 3
+
+        assert await session.get_frame() == (Frame.HEARTBEAT, b"h")
+        assert await session.get_frame() == (Frame.MESSAGE, b'a["msg3"]')
+        assert await session.get_frame() == (Frame.MESSAGE_BLOB, b'a["msg4"]')
+        assert session.dropped == 2
+        assert session._queue == ()
+
+    async def test_manager_limits(self, app, make_handler):
+        limits = QueueLimits(max_messages=1)
+        sm = SessionManager("sm", app, make_handler([]), queue_limits=limits)
+        session = sm.get("test", True)
+        assert session.queue_limits is limits
+        await sm.stop()
+
+
+class TestPriorityLanes:
+    async def test_order(self, make_session):
+        session = make_session(state=SessionState.OPEN)
+        session.send_frame(b'a["bulk1"]')
+        session.send("bulk2")
+        session.send("high1", priority=Priority.HIGH)
+        session.heartbeat()
+        session.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        session.send("high2", priority=Priority.HIGH)
+        session.send("bulk3")
+
+        assert session.queue_depths == {
+            Priority.CONTROL: 1,
+            Priority.HIGH: 1,
+            Priority.NORMAL: 2,
+        }
+        assert await session.get_frames() == [
+            (Frame.HEARTBEAT, b"h"),
+            (Frame.MESSAGE, b'a["high1","high2"]'),
+            (Frame.MESSAGE_BLOB, b'a["bulk1"]'),
+            (Frame.MESSAGE, b'a["bulk2","bulk3"]'),
+        ]
+        assert session.queue_depths == {
+            Priority.CONTROL: 0,
+            Priority.HIGH: 0,
+            Priority.NORMAL: 0,
+        }
+
+    async def test_merged_frame(self, make_session):
+        session = make_session(state=SessionState.OPEN)
+        session.send("bulk1")
+        session.send("high1", priority=Priority.HIGH)
+        session.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        assert await session.get_merged_frame() == (
+            Frame.MESSAGE,
+            b'a["high1","bulk1"]',
+        )
+
+    async def test_high_priority_limits(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, queue_limits=QueueLimits(max_messages=2)
+        )
+        session.send("bulk1")
+        assert session.send("high1", priority=Priority.HIGH)
+        # the normal priority is dropped first
+        assert session.send("high2", priority=Priority.HIGH)
+        assert session.send("high3", priority=Priority.HIGH)
+        assert session.dropped == 2
+        assert await session.get_frames() == [
+            (Frame.MESSAGE, b'a["high2","high3"]'),
+        ]
+        assert session._high == ()
+
+    async def test_high_priority_ttl(self, make_session):
+        now = [0.0]
+        session = make_session(
+            state=SessionState.OPEN,
+            queue_limits=QueueLimits(ttl=1),
+            clock=lambda: now[0],
+        )
+        session.send("high1", priority=Priority.HIGH)
+        now[0] = 1.5
+        session.send("high2", priority=Priority.HIGH)
+        now[0] = 2.0
+        assert await session.get_frames() == [(Frame.MESSAGE, b'a["high2"]')]
+        assert session.dropped == 1
+
+    def test_high_priority_overflow_close(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN,
+            queue_limits=QueueLimits(
+                max_bytes=10, overflow=OverflowPolicy.CLOSE, close_reason="Full"
+            ),
+        )
+        session.send("high1", priority=Priority.HIGH)
+        assert not session.send("bulk1-bulk1")
+        assert session._high.count == 0
+        assert list(session._queue) == [(Frame.CLOSE, (3000, "Full"))]
+
+    def test_control_priority(self, make_session):
+        session = make_session(state=SessionState.OPEN)
+        with pytest.raises(ValueError):
+            session.send("msg", priority=Priority.CONTROL)
+
+
+class TestConflation:
+    async def test_send_conflated(self, make_session):
+        session = make_session(state=SessionState.OPEN)
+        session.send("msg0")
+        assert session._queue.conflated is None
+        assert await session.get_frame() == (Frame.MESSAGE, b'a["msg0"]')
+
+        assert session.send_conflated("a", "a1")
+        assert session.send_conflated("b", "b1")
+        assert session.send_conflated("a", "a2")
+        session.send("msg")
+        assert session.send_conflated("a", "a3")
+        assert session.send_conflated("c", "c1")
+
+        assert await session.get_frame() == (Frame.MESSAGE, b'a["a3","b1"]')
+        assert await session.get_frame() == (Frame.MESSAGE, b'a["msg"]')
+        assert await session.get_frame(pack=False) == (Frame.MESSAGE, ["c1"])
+        assert session._queue == ()
+
+        session.send_conflated("a", "a4")
+        assert await session.get_frame() == (Frame.MESSAGE, b'a["a4"]')
+
+    def test_send_conflated_str(self, make_session):
+        session = make_session(state=SessionState.OPEN)
+        with pytest.raises(AssertionError):
+            session.send_conflated("a", {"a": 1})
+
+    async def test_send_conflated_closed(self, make_session):
+        session = make_session(state=SessionState.OPEN)
+        session.state = SessionState.CLOSING
+        assert not session.send_conflated("a", "a1")
+        assert not session._queue
+
+    async def test_merged_frame(self, make_session):
+        session = make_session(state=SessionState.OPEN)
+        session.send_frame(b'a["blob"]')
+        session.send_conflated("a", "a1")
+        session.feed(Frame.HEARTBEAT, protocol.HEARTBEAT_FRAME)
+        session.send("msg")
+        session.send_conflated("a", "a2")
+        assert await session.get_merged_frame() == (
+            Frame.MESSAGE,
+            b'a["blob","a2","msg"]',
+        )
+
+    async def test_ttl_and_limits(self, make_session, clock):
+        session = make_session(
+            state=SessionState.OPEN,
+            clock=clock,
+            queue_limits=QueueLimits(max_messages=1, ttl=1),
+        )
+        session.send_conflated("a", "a1")
+        session.send("msg1")
+        session.send_conflated("b", "b1")
+        clock.now += 2
+        assert await session.get_frames() == [
+            (Frame.MESSAGE, b'a["a1"]'),
+            (Frame.MESSAGE, b'a["b1"]'),
+        ]
+        assert session.dropped == 1
+
+
+class TestBatchWindow:
+    async def test_delay(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, batch_window=BatchWindow(delay=0.01)
+        )
+        get_frame = ensure_future(session.get_frame())
+        await asyncio.sleep(0)
+
+        session.send("msg1")
+        session.send("msg2")
+        await asyncio.sleep(0.001)
+        assert not get_frame.done()
+
+        assert await get_frame == (Frame.MESSAGE, b'a["msg1","msg2"]')
+        window = session.batch_window
+        assert (window.batches, window.messages, window.sizes) == (1, 2, {2: 1})
+
+    async def test_queued_messages_wait_for_window(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, batch_window=BatchWindow(delay=0.01)
+        )
+        session.send("msg1")
+        get_frame = ensure_future(session.get_frame())
+        await asyncio.sleep(0.001)
+        assert not get_frame.done()
+        assert await get_frame == (Frame.MESSAGE, b'a["msg1"]')
+
+    async def test_max_messages(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, batch_window=BatchWindow(delay=10, max_messages=3)
+        )
+        get_frame = ensure_future(session.get_frame())
+        await asyncio.sleep(0)
+
+        session.send("msg1")
+        session.send_frame(b'a["msg2"]')
+        await asyncio.sleep(0)
+        assert not get_frame.done()
+
+        session.send("msg3")
+        assert await get_frame == (Frame.MESSAGE, b'a["msg1"]')
+        assert session._flush_timer is None
+        assert session.batch_window.sizes == {4: 1}
+
+    async def test_control_frame_flushes(self, make_session):
+        session = make_session(
+            state=SessionState.OPEN, batch_window=BatchWindow(delay=10)
+        )
+        session.send("msg1")
+        session.close()
+        assert await session.get_frames() == [
+            (Frame.MESSAGE, b'a["msg1"]'),
+            (Frame.CLOSE, b'c[3000,"Go away!"]'),
+        ]
+
+    def test_stats(self):
+        window = BatchWindow()
+        assert window.mean_size == 0.0
+        for size in (1, 2, 3, 4, 5, 16):
+            window.record(size)
+        assert window.sizes == {1: 1, 2: 1, 4: 2, 8: 1, 16: 1}
+        assert window.mean_size == 31 / 6
+
+        window.reset()
+        assert (window.batches, window.messages, window.sizes) == (0, 0, {})
+
+
+async def test_endpoint_batch_window(app, make_handler):
+    window = BatchWindow(delay=0.01)
+    add_endpoint(app, make_handler([]), name="main", batch_window=window)
+    manager = get_manager("main", app)
+    assert manager.get("s1", create=True).batch_window is window
+    await manager.stop()
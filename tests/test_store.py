@@ -0,0 +1,227 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from sockjs import (
+    MemoryStore,
+    MsgType,
+    QueueLimits,
+    RemoteSession,
+    SessionStore,
+    SessionManager,
+    SessionState,
+    SQLiteStore,
+    add_endpoint,
+    get_manager,
+)
+from sockjs.protocol import Frame
+
+
+@pytest.fixture(params=["memory", "sqlite", "sqlite-no-returning"])
+async def make_stores(request, tmp_path):
+    stores = []
+
+    def maker():
+        if request.param == "memory":
+            first = MemoryStore(0)
+            pair = (first, first.for_worker(1))
+        else:
+            path = str(tmp_path / "sessions.db")
+            pair = (SQLiteStore(path, worker=0), SQLiteStore(path, worker=1))
+            if request.param == "sqlite-no-returning":
+                for store in pair:
+                    store.returning = False
+        stores.extend(pair)
+        return pair
+
+    yield maker
+
+    for store in stores:
+        await store.close()
+
+
+def test_registry(make_stores):
+    store0, store1 = make_stores()
+    assert store1.owner("sm", "s1") is None
+
+    store0.add("sm", "s1")
+    assert store1.owner("sm", "s1") == 0
+    assert store1.owner("other", "s1") is None
+
+    assert store1.acquire("sm", "s1")
+    assert not store0.acquire("sm", "s1")
+    assert store0.remote_acquired("sm") == ["s1"]
+    assert store1.remote_acquired("sm") == []
+
+    store0.release("sm", "s1")
+    assert store0.remote_acquired("sm") == ["s1"]
+    store1.release("sm", "s1")
+    assert store0.remote_acquired("sm") == []
+    assert store0.acquire("sm", "s1")
+    assert store0.remote_acquired("sm") == []
+
+
+def test_mailboxes(make_stores):
+    store0, store1 = make_stores()
+    store0.add("sm", "s1")
+
+    store1.put_inbound("sm", "s1", 0, MsgType.MESSAGE, b'["a"]')
+    store1.put_inbound("sm", "s1", 0, MsgType.CLOSE, b"")
+    store1.put_inbound("sm", "s2", 1, MsgType.MESSAGE, b'["b"]')
+    assert store0.take_inbound("sm") == [
+        ("s1", MsgType.MESSAGE, b'["a"]'),
+        ("s1", MsgType.CLOSE, b""),
+    ]
+    assert store0.take_inbound("sm") == []
+
+    assert not store1.has_frames("sm", "s1")
+    store0.put_frame("sm", "s1", Frame.MESSAGE, b'a["a"]')
+    store0.put_frame("sm", "s1", Frame.CLOSE, b'c[3000,"Go away!"]')
+    assert store1.has_frames("sm", "s1")
+    assert store1.take_frames("sm", "s1") == [
+        (Frame.MESSAGE, b'a["a"]'),
+        (Frame.CLOSE, b'c[3000,"Go away!"]'),
+    ]
+    assert store1.take_frames("sm", "s1") == []
+
+
+def test_clear(make_stores):
+    store0, store1 = make_stores()
+    store0.add("sm", "s1")
+    store1.add("sm", "s2")
+    store0.put_frame("sm", "s1", Frame.MESSAGE, b'a["a"]')
+
+    store0.clear("sm")
+    assert store0.owner("sm", "s1") is None
+    assert store0.owner("sm", "s2") == 1
+    assert not store1.has_frames("sm", "s1")
+
+    store1.remove("sm", "s2")
+    assert store0.owner("sm", "s2") is None
+
+
+async def test_remote_session_heartbeat(app, make_handler):
+    store = MemoryStore(1)
+    store.for_worker(0).add("sm", "s1")
+    add_endpoint(app, make_handler([]), name="sm", store=store, heartbeat_delay=0.01)
+    manager = get_manager("sm", app)
+
+    assert manager.get("s1", default=None) is None
+    session = await manager.get_remote("s1")
+    assert isinstance(session, RemoteSession)
+    assert session.owner == 0
+    assert "s1" not in manager.sessions
+    assert await session.get_frames() == [(Frame.HEARTBEAT, b"h")]
+    await manager.stop()
+
+
+async def test_polling_across_workers(make_stores, aiohttp_client):
+    received = [[], []]
+
+    def make_app(index, store):
+        async def handler(manager, session, msg):
+            received[index].append(msg.type)
+            if msg.type == MsgType.MESSAGE:
+                session.send(msg.data.upper())
+
+        app = web.Application()
+        add_endpoint(app, handler, name="main", store=store)
+        return app
+
+    store0, store1 = make_stores()
+    client0 = await aiohttp_client(make_app(0, store0))
+    client1 = await aiohttp_client(make_app(1, store1))
+
+    resp = await client0.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b"o\n"
+
+    resp = await client1.post("/sockjs/000/s1/xhr_send", data=b'["msg"]')
+    assert resp.status == 204
+    resp = await client1.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'a["MSG"]\n'
+    assert received == [[MsgType.OPEN, MsgType.MESSAGE], []]
+    assert "s1" not in get_manager("main", client1.app).sessions
+
+    # the session is served by its owner again
+    resp = await client0.post("/sockjs/000/s1/xhr_send", data=b'["msg2"]')
+    assert resp.status == 204
+    resp = await client0.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'a["MSG2"]\n'
+
+
+async def test_remote_acquired_session(make_stores, aiohttp_client, make_handler):
+    store0, store1 = make_stores()
+    app0 = web.Application()
+    add_endpoint(app0, make_handler([]), name="main", store=store0)
+    app1 = web.Application()
+    add_endpoint(app1, make_handler([]), name="main", store=store1)
+    client0 = await aiohttp_client(app0)
+    client1 = await aiohttp_client(app1)
+
+    resp = await client0.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b"o\n"
+
+    poll = asyncio.ensure_future(client1.post("/sockjs/000/s1/xhr"))
+    while not store0.remote_acquired("main"):
+        await asyncio.sleep(0.005)
+    resp = await client0.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'c[2010,"Another connection still open"]\n'
+
+    session = get_manager("main", app0).sessions["s1"]
+    session.send("msg")
+    resp = await poll
+    assert await resp.read() == b'a["msg"]\n'
+
+
+async def test_exchange_skips_expired_messages(app, make_handler):
+    now = [0.0]
+    store = MemoryStore(0)
+    manager = SessionManager(
+        "sm",
+        app,
+        make_handler([]),
+        store=store,
+        queue_limits=QueueLimits(ttl=1),
+        clock=lambda: now[0],
+    )
+    session = manager.get("s1", True)
+    session.state = SessionState.OPEN
+    store.for_worker(1).acquire("sm", "s1")
+
+    session.send("expired")
+    now[0] = 2.0
+    await asyncio.wait_for(manager._store_exchange(), 1)
+    assert not session._has_frames()
+    assert not store.has_frames("sm", "s1")
+
+    session.send("msg")
+    await manager._store_exchange()
+    assert store.for_worker(1).take_frames("sm", "s1") == [
+        (Frame.MESSAGE, b'a["msg"]')
+    ]
+    await manager.stop()
+
+
+def test_abstract_store():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+async def test_store_closed_on_cleanup(aiohttp_client, make_handler, tmp_path):
+    store = SQLiteStore(str(tmp_path / "sessions.db"))
+    app = web.Application()
+    add_endpoint(
+        app, make_handler([]), name="main", store=store, store_interval=0.01
+    )
+    assert get_manager("main", app).store_interval == 0.01
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b"o\n"
+    assert await store.run(store.owner, "main", "s1") == 0
+    await client.close()
+
+    assert not store._connections
+    with pytest.raises(RuntimeError):
+        await store.run(store.owner, "main", "s1")
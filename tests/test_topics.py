@@ -0,0 +1,74 @@
+import pytest
+
+from sockjs.topics import TopicIndex
+
+
+def test_subscribe(make_session):
+    index = TopicIndex()
+    s1 = make_session("s1")
+    s2 = make_session("s2")
+
+    assert index.subscribe(s1, "room1")
+    assert not index.subscribe(s1, "room1")
+    index.subscribe(s2, "room2")
+
+    assert index.subscribers("room1") == {s1}
+    assert index.subscribers("room2") == {s2}
+    assert index.subscribers("room3") == set()
+    assert index.patterns(s1) == {"room1"}
+    assert len(index) == 2
+
+
+def test_unsubscribe(make_session):
+    index = TopicIndex()
+    s1 = make_session("s1")
+    s2 = make_session("s2")
+    index.subscribe(s1, "chat.room1")
+    index.subscribe(s2, "chat.room1")
+
+    assert index.unsubscribe(s1, "chat.room1")
+    assert not index.unsubscribe(s1, "chat.room1")
+    assert index.subscribers("chat.room1") == {s2}
+
+    index.unsubscribe(s2, "chat.room1")
+    assert index.subscribers("chat.room1") == set()
+    assert index._root.children == {}
+    assert len(index) == 0
+
+
+def test_unsubscribe_all(make_session):
+    index = TopicIndex()
+    session = make_session()
+    index.subscribe(session, "room1")
+    index.subscribe(session, "room2.*")
+
+    index.unsubscribe_all(session)
+    assert index.patterns(session) == frozenset()
+    assert index.subscribers("room1") == set()
+    assert index.subscribers("room2.a") == set()
+
+
+@pytest.mark.parametrize(
+    "pattern,topic,matched",
+    [
+        ("chat.*", "chat.room1", True),
+        ("chat.*", "chat", False),
+        ("chat.*", "chat.room1.messages", False),
+        ("chat.*.messages", "chat.room1.messages", True),
+        ("chat.#", "chat", True),
+        ("chat.#", "chat.room1.messages", True),
+        ("chat.#", "news.room1", False),
+        ("#", "news.room1", True),
+    ],
+)
+def test_patterns(make_session, pattern, topic, matched):
+    index = TopicIndex()
+    session = make_session()
+    index.subscribe(session, pattern)
+    assert (session in index.subscribers(topic)) is matched
+
+
+def test_bad_pattern(make_session):
+    index = TopicIndex()
+    with pytest.raises(ValueError):
+        index.subscribe(make_session(), "chat.#.messages")
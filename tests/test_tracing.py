@@ -0,0 +1,207 @@
+import json
+
+import pytest
+from aiohttp import web
+
+from sockjs import (
+    Frame,
+    JSONLSink,
+    LatencyTracer,
+    MsgType,
+    SamplingTracer,
+    SessionState,
+    SpanSink,
+    Tracer,
+    add_endpoint,
+)
+
+
+class RecordingTracer(Tracer):
+    def __init__(self):
+        self.events = []
+
+    def on_message_received(self, session, transport, size):
+        self.events.append(("received", transport, size))
+
+    def on_frame_enqueued(self, session, frame, data):
+        self.events.append(("enqueued", frame))
+
+    def on_frame_dequeued(self, session, frame):
+        self.events.append(("dequeued", frame))
+
+    def on_frame_written(self, session, transport, size):
+        self.events.append(("written", transport, size))
+
+    def on_handler_start(self, session, msg):
+        self.events.append(("start", msg.type))
+
+    def on_handler_end(self, session, msg):
+        self.events.append(("end", msg.type))
+
+    def on_session_state_change(self, session, old, new):
+        self.events.append(("state", old, new))
+
+
+async def test_tracer_events(aiohttp_client):
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            session.send(msg.data)
+
+    tracer = RecordingTracer()
+    app = web.Application()
+    add_endpoint(app, handler, name="main", tracer=tracer)
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b"o\n"
+    resp = await client.post("/sockjs/000/s1/xhr_send", data=b'["a"]')
+    assert resp.status == 204
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'a["a"]\n'
+
+    assert tracer.events == [
+        ("state", SessionState.NEW, SessionState.OPEN),
+        ("enqueued", Frame.OPEN),
+        ("start", MsgType.OPEN),
+        ("end", MsgType.OPEN),
+        ("dequeued", Frame.OPEN),
+        ("written", "xhr-polling", 2),
+        ("received", "xhr-polling", 5),
+        ("start", MsgType.MESSAGE),
+        ("enqueued", Frame.MESSAGE),
+        ("end", MsgType.MESSAGE),
+        ("dequeued", Frame.MESSAGE),
+        ("written", "xhr-polling", 7),
+    ]
+
+
+async def test_attach_tracer(make_manager):
+    manager = make_manager()
+    session = manager.get("s1", True)
+    assert session.tracer is None
+
+    tracer = RecordingTracer()
+    manager.tracer = tracer
+    assert session.tracer is tracer
+    assert manager.get("s2", True).tracer is tracer
+
+    session.close()
+    assert tracer.events == [
+        ("state", SessionState.NEW, SessionState.CLOSING),
+        ("enqueued", Frame.CLOSE),
+    ]
+
+    manager.tracer = None
+    assert session.tracer is None
+
+
+async def test_sampling_tracer(make_manager):
+    clock = iter(range(100)).__next__
+    tracer = SamplingTracer(every=2, clock=clock)
+    manager = make_manager()
+    manager.tracer = tracer
+    session = manager.get("s1", True)
+    session.state = SessionState.OPEN
+
+    for _ in range(4):
+        await manager.remote_message(session, "msg")
+    assert len(tracer.samples["handler"]) == 2
+
+    session.send("a")
+    session.send("b")
+    tracer.on_frame_written(session, "xhr", 10)
+    session.send("c")
+    tracer.on_frame_written(session, "xhr", 10)
+    assert len(tracer.samples["queue"]) == 1
+
+    session.close()
+    assert tracer.transitions == {(SessionState.OPEN, SessionState.CLOSING): 1}
+
+
+def test_percentiles():
+    tracer = SamplingTracer()
+    assert tracer.percentiles("handler") == {}
+
+    tracer.samples["handler"].extend(range(100, 0, -1))
+    assert tracer.percentiles("handler") == {50: 50, 90: 90, 99: 99}
+    assert tracer.percentiles("handler", (0, 100)) == {0: 1, 100: 100}
+
+    tracer.clear()
+    assert tracer.percentiles("handler") == {}
+
+
+class ListSink(SpanSink):
+    def __init__(self):
+        self.spans = []
+        self.closed = False
+
+    def emit(self, span):
+        self.spans.append(span)
+
+    def close(self):
+        self.closed = True
+
+
+async def test_latency_spans(aiohttp_client):
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE and msg.data != "quiet":
+            session.send(msg.data)
+
+    sink = ListSink()
+    tracer = LatencyTracer(sink, every=2, clock=iter(range(100)).__next__)
+    app = web.Application()
+    add_endpoint(app, handler, name="main", tracer=tracer)
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b"o\n"
+    # the second and the fourth payloads are sampled
+    for data in (b'["a"]', b'["quiet"]', b'["c"]', b'["d"]'):
+        resp = await client.post("/sockjs/000/s1/xhr_send", data=data)
+        assert resp.status == 204
+    assert len(sink.spans) == 1
+    assert sink.spans[0].handler_end is not None
+    assert sink.spans[0].enqueued is None
+
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'a["a","c","d"]\n'
+    await client.close()
+
+    assert [span.session for span in sink.spans] == ["s1", "s1"]
+    span = sink.spans[1]
+    assert span.transport == "xhr-polling"
+    assert span.write_transport == "xhr-polling"
+    assert (
+        span.received
+        < span.handler_start
+        < span.enqueued
+        < span.handler_end
+        < span.dequeued
+        < span.written
+    )
+    assert sink.closed
+
+
+async def test_jsonl_sink(make_manager, tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    tracer = LatencyTracer(JSONLSink(path), every=1)
+    manager = make_manager()
+    manager.tracer = tracer
+    session = manager.get("s1", True)
+
+    tracer.on_message_received(session, "websocket", 3)
+    await manager.remote_message(session, "msg")
+    await tracer.close()
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1
+    assert records[0]["session"] == "s1"
+    assert records[0]["transport"] == "websocket"
+    assert records[0]["handler_end"] >= records[0]["handler_start"]
+    assert records[0]["written"] is None
+
+
+def test_abstract_sink():
+    with pytest.raises(TypeError):
+        SpanSink()
@@ -4,13 +4,14 @@ import pytest
 from aiohttp import web
 from aiohttp.test_utils import make_mocked_coro
 
-from sockjs import SessionState
+from sockjs import Frame, SessionState
+from sockjs.protocol import HEARTBEAT_FRAME
 from sockjs.transports import base
 
 
 class FakeStreamingTransport(base.StreamingTransport):
-    async def _send(self, text: str):
-        return await super()._send(text + "\n")
+    def _encode(self, frame: bytes) -> bytes:
+        return frame + b"\n"
 
     async def process(self):
         raise NotImplementedError
@@ -34,13 +35,13 @@ async def test_streaming_send(make_transport):
 
     resp = trans.response = mock.Mock()
     resp.write = make_mocked_coro(None)
-    stop = await trans._send("text data")
+    stop = await trans._send(b"text data")
     assert not stop
     assert trans.size == len(b"text data\n")
     resp.write.assert_called_with(b"text data\n")
 
     trans.maxsize = 1
-    stop = await trans._send("text data")
+    stop = await trans._send(b"text data")
     assert stop
 
 
@@ -50,7 +51,7 @@ async def test_handle_session_interrupted(make_transport, make_fut):
     trans._send = make_fut(1)
     trans.response = web.StreamResponse()
     await trans.handle_session()
-    trans._send.assert_called_with('c[1002,"Connection interrupted"]')
+    trans._send.assert_called_with(b'c[1002,"Connection interrupted"]')
 
 
 async def test_handle_session_closing(make_transport, make_fut):
@@ -63,7 +64,7 @@ async def test_handle_session_closing(make_transport, make_fut):
     trans.response = web.StreamResponse()
     await trans.handle_session()
     manager.remote_closed.assert_called()
-    trans._send.assert_called_with('c[3000,"Go away!"]')
+    trans._send.assert_called_with(b'c[3000,"Go away!"]')
 
 
 async def test_handle_session_closed(make_transport, make_fut):
@@ -76,4 +77,52 @@ async def test_handle_session_closed(make_transport, make_fut):
     trans.response = web.StreamResponse()
     await trans.handle_session()
     manager.remote_closed.assert_called()
-    trans._send.assert_called_with('c[3000,"Go away!"]')
+    trans._send.assert_called_with(b'c[3000,"Go away!"]')
+
+
+async def test_handle_session_coalesces_frames(make_transport):
+    trans = make_transport()
+    trans.maxsize = 20
+    session = trans.session
+    session.state = SessionState.OPEN
+    session.send("msg1")
+    session.send_frame(b'a["msg2"]')
+    session.feed(Frame.HEARTBEAT, HEARTBEAT_FRAME)
+
+    resp = trans.response = mock.Mock()
+    resp.write = make_mocked_coro(None)
+    await trans.handle_session()
+    resp.write.assert_called_once_with(b'h\na["msg1"]\na["msg2"]\n')
+
+
+async def test_handle_session_close_frame(make_transport, make_fut):
+    trans = make_transport()
+    session = trans.session
+    session.state = SessionState.OPEN
+    session.send("msg1")
+    session.send_frame(b'a["msg2"]')
+    session.feed(Frame.CLOSE, (3000, "Go away!"))
+    trans.manager.remote_closed = make_fut(1)
+
+    resp = trans.response = mock.Mock()
+    resp.write = make_mocked_coro(None)
+    await trans.handle_session()
+    resp.write.assert_called_once_with(
+        b'a["msg1"]\na["msg2"]\nc[3000,"Go away!"]\n'
+    )
+    trans.manager.remote_closed.assert_called_with(session)
+
+
+async def test_handle_session_maxsize(make_transport):
+    trans = make_transport()
+    trans.maxsize = 0
+    session = trans.session
+    session.state = SessionState.OPEN
+    session.send_frame(b'a["msg1"]')
+    session.send_frame(b'a["msg2"]')
+
+    resp = trans.response = mock.Mock()
+    resp.write = make_mocked_coro(None)
+    await trans.handle_session()
+    resp.write.assert_called_once_with(b'a["msg1"]\n')
+    assert await session.get_frame() == (Frame.MESSAGE_BLOB, b'a["msg2"]')
@@ -3,6 +3,7 @@ from unittest import mock
 import pytest
 from aiohttp.test_utils import make_mocked_coro
 
+from sockjs.protocol import FrameBlob
 from sockjs.transports import EventsourceTransport
 
 
@@ -24,13 +25,13 @@ async def test_streaming_send(make_transport):
 
     resp = trans.response = mock.Mock()
     resp.write = make_mocked_coro(None)
-    stop = await trans._send("text data")
+    stop = await trans._send(b"text data")
     resp.write.assert_called_with(b"data: text data\r\n\r\n")
     assert not stop
     assert trans.size == len(b"data: text data\r\n\r\n")
 
     trans.maxsize = 1
-    stop = await trans._send("text data")
+    stop = await trans._send(b"text data")
     assert stop
 
 
@@ -40,3 +41,16 @@ async def test_process(make_transport, make_fut):
     resp = await transp.process()
     assert transp.handle_session.called
     assert resp.status == 200
+
+
+async def test_streaming_send_shared_frame(make_transport, mocker):
+    blob = FrameBlob(b'a["msg"]')
+    encode = mocker.spy(EventsourceTransport, "_encode")
+    for _ in range(3):
+        trans = make_transport()
+        resp = trans.response = mock.Mock()
+        resp.write = make_mocked_coro(None)
+        await trans._send(blob)
+        resp.write.assert_called_with(b'data: a["msg"]\r\n\r\n')
+
+    assert encode.call_count == 1
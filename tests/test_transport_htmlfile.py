@@ -25,13 +25,13 @@ async def test_streaming_send(make_transport):
 
     resp = trans.response = mock.Mock()
     resp.write = make_mocked_coro(None)
-    stop = await trans._send("text data")
+    stop = await trans._send(b"text data")
     resp.write.assert_called_with(b'<script>\np("text data");\n</script>\r\n')
     assert not stop
     assert trans.size == len(b'<script>\np("text data");\n</script>\r\n')
 
     trans.maxsize = 1
-    stop = await trans._send("text data")
+    stop = await trans._send(b"text data")
     assert stop
 
 
@@ -4,6 +4,7 @@ import pytest
 from aiohttp import web
 from aiohttp.test_utils import make_mocked_coro
 
+from sockjs.protocol import FrameBlob
 from sockjs.transports import jsonp
 
 
@@ -26,11 +27,28 @@ async def test_streaming_send(make_transport):
 
     resp = trans.response = mock.Mock()
     resp.write = make_mocked_coro(None)
-    stop = await trans._send("text data")
+    stop = await trans._send(b"text data")
     resp.write.assert_called_with(b'/**/cb("text data");\r\n')
+    assert not stop
+
+    trans.maxsize = 1
+    stop = await trans._send(b"text data")
     assert stop
 
 
+async def test_streaming_send_shared_frame(make_transport):
+    blob = FrameBlob(b'a["msg"]')
+    for callback in ("cb1", "cb2"):
+        trans = make_transport()
+        trans.callback = callback
+        resp = trans.response = mock.Mock()
+        resp.write = make_mocked_coro(None)
+        await trans._send(blob)
+        resp.write.assert_called_with(
+            b'/**/%s("a[\\"msg\\"]");\r\n' % callback.encode()
+        )
+
+
 async def test_process(make_transport, make_fut):
     transp = make_transport(query_params={"c": "calback"})
     transp.handle_session = make_fut(1)
@@ -3,11 +3,11 @@ from unittest import mock
 
 import pytest
 from aiohttp import WSMessage, WSMsgType
+from aiohttp.test_utils import make_mocked_coro
 
 from sockjs.exceptions import SessionIsClosed
-from sockjs.protocol import Frame
+from sockjs.protocol import Frame, FrameBlob
 from sockjs.transports.rawwebsocket import RawWebSocketTransport
-from sockjs.transports.utils import cancel_tasks
 
 
 @pytest.fixture
@@ -66,4 +66,25 @@ async def test_sends_ping(make_transport, make_fut):
 
     await transp.server(ws)
     assert ws.ping.called
-    await cancel_tasks(transp._wait_pong_task)
+    transp.manager.heartbeat_scheduler.wait_pong.assert_called_with(
+        session, transp.heartbeat_timeout
+    )
+
+
+async def test_sends_encoded_text(make_transport):
+    transp = make_transport()
+
+    blob_future = Future()
+    blob_future.set_result((Frame.MESSAGE_BLOB, FrameBlob(b'a["msg"]')))
+
+    session_close_future = Future()
+    session_close_future.set_exception(SessionIsClosed)
+
+    session = mock.Mock()
+    session.get_frame.side_effect = [blob_future, session_close_future]
+    transp.session = session
+
+    ws = mock.Mock()
+    ws.send_frame = make_mocked_coro(None)
+    await transp.server(ws)
+    ws.send_frame.assert_called_with(b'"msg"', WSMsgType.TEXT)
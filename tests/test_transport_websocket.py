@@ -1,5 +1,5 @@
 import asyncio
-import datetime
+import time
 from asyncio import Future
 from unittest import mock
 
@@ -13,14 +13,14 @@ from sockjs.transports import WebSocketTransport
 
 
 @pytest.fixture
-def make_transport(make_manager, make_request, make_handler, make_fut):
+def make_transport(make_manager, make_request, make_handler, make_fut, mocker):
     def maker(method="GET", path="/", query_params=None, handler=None):
         handler = handler or make_handler(None)
         manager = make_manager(handler)
         request = make_request(method, path, query_params=query_params)
         request.app.freeze()
         session = manager.get("TestSessionWebsocket", create=True)
-        session.get_frame = make_fut((Frame.CLOSE, ""))
+        mocker.patch.object(Session, "get_frame", make_fut((Frame.CLOSE, "")))
         return WebSocketTransport(manager, session, request)
 
     return maker
@@ -73,7 +73,7 @@ async def test_server_close(app, make_manager, make_request):
     assert reached_closed is False
     assert session.expires
     assert not session.expired
-    session.expires = datetime.datetime.now()
+    session.expires = time.monotonic()
     await manager._gc_expired_sessions()
 
     assert reached_closed is True
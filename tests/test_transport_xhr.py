@@ -1,5 +1,10 @@
+from unittest import mock
+
 import pytest
+from aiohttp.test_utils import make_mocked_coro
 
+from sockjs import Frame, MsgType, SessionState, add_endpoint, get_manager
+from sockjs.protocol import HEARTBEAT_FRAME, OPEN_FRAME
 from sockjs.transports import xhr_pooling
 
 
@@ -28,3 +33,39 @@ async def test_process_options(make_transport):
     transp = make_transport(method="OPTIONS")
     resp = await transp.process()
     assert resp.status == 204
+
+
+async def test_handle_session_merges_messages(make_transport):
+    transp = make_transport()
+    session = transp.session
+    session.state = SessionState.OPEN
+    session.feed(Frame.OPEN, OPEN_FRAME)
+    session.send("msg1")
+    session.send_frame(b'a["msg2"]')
+    session.feed(Frame.HEARTBEAT, HEARTBEAT_FRAME)
+
+    for expected in (b"o\n", b'a["msg1","msg2"]\n'):
+        resp = transp.response = mock.Mock()
+        resp.write = make_mocked_coro(None)
+        await transp.handle_session()
+        resp.write.assert_called_once_with(expected)
+
+
+async def test_endpoint_maxsize(app, aiohttp_client):
+    async def handler(manager, session, msg):
+        if msg.type == MsgType.MESSAGE:
+            manager.broadcast(msg.data)
+
+    add_endpoint(app, handler, name="main", maxsize=16)
+    assert get_manager("main", app).maxsize == 16
+    client = await aiohttp_client(app)
+
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b"o\n"
+    data = b'["msg1", "msg2", "msg3"]'
+    resp = await client.post("/sockjs/000/s1/xhr_send", data=data)
+    assert resp.status == 204
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'a["msg1","msg2"]\n'
+    resp = await client.post("/sockjs/000/s1/xhr")
+    assert await resp.read() == b'a["msg3"]\n'
@@ -0,0 +1,98 @@
+import pytest
+from aiohttp import web
+
+from sockjs import MsgType, WorkerGroup, add_endpoint, get_manager
+from sockjs.workers import FORWARDED_HEADER
+
+
+def test_owner(tmp_path):
+    group = WorkerGroup(4, str(tmp_path))
+    assert group.owner("000", "abc") == 0
+    assert group.owner("006", "abc") == 2
+    assert group.owner("srv", "abc") == group.owner("node", "abc")
+    assert {group.owner("srv", "s%d" % idx) for idx in range(100)} == {0, 1, 2, 3}
+
+
+def test_invalid_workers(tmp_path):
+    with pytest.raises(ValueError):
+        WorkerGroup(0, str(tmp_path))
+
+
+async def test_forward_to(tmp_path, make_request):
+    group = WorkerGroup(2, str(tmp_path), index=0)
+    request = make_request("POST", "/sockjs/001/s1/xhr")
+    assert group.forward_to(request, "000", "s1", "xhr") is None
+    assert group.forward_to(request, "001", "s1", "xhr") == 1
+    assert group.forward_to(request, "001", "s1", "websocket") is None
+
+    # the header is set by clients as well
+    request = make_request(
+        "POST", "/sockjs/001/s1/xhr", headers={FORWARDED_HEADER: "1"}
+    )
+    assert group.forward_to(request, "001", "s1", "xhr") == 1
+
+    request.transport.get_extra_info.return_value = group.socket_path(0)
+    assert group.forward_to(request, "001", "s1", "xhr") is None
+    request.transport.get_extra_info.assert_called_with("sockname")
+
+
+async def test_forward_polling_session(tmp_path, aiohttp_client):
+    received = [[], []]
+
+    def make_app(index):
+        async def handler(manager, session, msg):
+            if msg.type == MsgType.MESSAGE:
+                received[index].append(msg.data)
+                session.send(msg.data.upper())
+
+        app = web.Application()
+        group = WorkerGroup(2, str(tmp_path), index=index)
+        add_endpoint(app, handler, name="main", workers=group)
+        return app, group
+
+    app0, group0 = make_app(0)
+    app1, group1 = make_app(1)
+    runner = web.AppRunner(app1)
+    await runner.setup()
+    await web.UnixSite(runner, group1.socket_path(1)).start()
+    try:
+        client = await aiohttp_client(app0)
+
+        resp = await client.post("/sockjs/001/s1/xhr")
+        assert await resp.read() == b"o\n"
+        assert "JSESSIONID" in resp.cookies
+        resp = await client.post("/sockjs/001/s1/xhr_send", data=b'["msg"]')
+        assert resp.status == 204
+        resp = await client.post("/sockjs/001/s1/xhr")
+        assert await resp.read() == b'a["MSG"]\n'
+        assert received == [[], ["msg"]]
+        assert group0.forwarded == 3
+
+        resp = await client.post(
+            "/sockjs/001/s1/xhr_send", data=b'["msg2"]', headers={FORWARDED_HEADER: "1"}
+        )
+        assert resp.status == 204
+        assert received == [[], ["msg", "msg2"]]
+        assert group0.forwarded == 4
+        resp = await client.post("/sockjs/001/s1/xhr")
+        assert await resp.read() == b'a["MSG2"]\n'
+
+        resp = await client.post("/sockjs/000/s1/xhr")
+        assert await resp.read() == b"o\n"
+        assert group0.forwarded == 5
+        assert "s1" in get_manager("main", app0).sessions
+    finally:
+        await runner.cleanup()
+
+
+async def test_forward_owner_unavailable(tmp_path, aiohttp_client):
+    async def handler(manager, session, msg):
+        pass
+
+    app = web.Application()
+    add_endpoint(
+        app, handler, name="main", workers=WorkerGroup(2, str(tmp_path), index=0)
+    )
+    client = await aiohttp_client(app)
+    resp = await client.post("/sockjs/001/s1/xhr")
+    assert resp.status == 502